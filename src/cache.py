@@ -0,0 +1,271 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from cachetools import TLRUCache, TTLCache
+
+from json_codec import RawJSON, dumps
+from logger import logger
+
+
+class MetadataSnapshot:
+    """An immutable view of the metadata catalog with precomputed lookups."""
+
+    __slots__ = ("catalog", "record_types", "fields", "fetched_at")
+
+    def __init__(self, catalog: Dict[str, Any], fetched_at: float):
+        records = catalog.get("records", [])
+        self.catalog = catalog
+        self.record_types: FrozenSet[str] = frozenset(record["type"] for record in records)
+        self.fields: Dict[str, Dict[str, str]] = {
+            record["type"]: {field["name"]: field.get("type") for field in record.get("fields", [])}
+            for record in records
+        }
+        self.fetched_at = fetched_at
+
+
+class MetadataCache:
+    """TTL cache for the metadata catalog with stale-while-revalidate refresh.
+
+    Fresh snapshots are served directly. Once a snapshot is older than ``ttl`` it
+    is still served, and a single background task refreshes it. Callers only wait
+    on the network when there is no snapshot at all.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Dict[str, Any]]], ttl: float = 300.0):
+        self.loader = loader
+        self.ttl = ttl
+        self._snapshot: Optional[MetadataSnapshot] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.invalidations = 0
+
+    async def get(self) -> MetadataSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.misses += 1
+            return await self._start_refresh()
+        if time.monotonic() - snapshot.fetched_at < self.ttl:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+            self._start_refresh()
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Drop the current snapshot so the next call refetches the catalog.
+
+        A refresh already in flight may have read the old catalog, so its result
+        is discarded and the next call starts a new one.
+        """
+        self.invalidations += 1
+        self._snapshot = None
+        self._refresh = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "invalidations": self.invalidations,
+            "record_types": len(self._snapshot.record_types) if self._snapshot else 0,
+        }
+
+    def _start_refresh(self) -> asyncio.Task:
+        # Concurrent misses and stale reads share one in-flight refresh.
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._load())
+        return self._refresh
+
+    async def _load(self) -> MetadataSnapshot:
+        self.refreshes += 1
+        invalidations = self.invalidations
+        try:
+            catalog = await self.loader()
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.error("Error refreshing metadata catalog: %s", e)
+            if self._snapshot is not None:
+                return self._snapshot
+            raise
+        snapshot = MetadataSnapshot(catalog, time.monotonic())
+        if self.invalidations == invalidations:
+            self._snapshot = snapshot
+        return snapshot
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory cost of a cached record by its JSON length."""
+    if isinstance(value, RawJSON):
+        return len(value.raw)
+    try:
+        return len(dumps(value))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class RecordCache:
+    """Read-through cache of records keyed by ``(record_type, record_id)``.
+
+    Entries expire after ``ttl`` seconds, and the least recently used entries are
+    evicted once the approximate size of all cached records exceeds ``max_bytes``.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._cache: TTLCache = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=estimate_size)
+        # Invalidation count per key while fetches of it are in flight, as
+        # [fetches, invalidations], so a fetch that raced a write is not cached.
+        self._fetching: Dict[Tuple[str, str], List[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, record_type: str, record_id: str) -> Optional[Dict[str, Any]]:
+        record = self._cache.get((record_type, str(record_id)))
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def put(self, record_type: str, record_id: str, record: Dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        try:
+            self._cache[(record_type, str(record_id))] = record
+        except ValueError:
+            # Larger than the whole cache budget; serve it uncached.
+            logger.debug("Record %s %s too large to cache", record_type, record_id)
+
+    def invalidate(self, record_type: str, record_id: Optional[str]) -> None:
+        if record_id is None:
+            return
+        key = (record_type, str(record_id))
+        if key in self._fetching:
+            self._fetching[key][1] += 1
+        if self._cache.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_type(self, record_type: str) -> None:
+        for key, fetching in self._fetching.items():
+            if key[0] == record_type:
+                fetching[1] += 1
+        for key in [key for key in self._cache.keys() if key[0] == record_type]:
+            self._cache.pop(key, None)
+            self.invalidations += 1
+
+    async def get_or_fetch(
+        self,
+        record_type: str,
+        record_id: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        record = self.get(record_type, record_id)
+        if record is not None:
+            return record
+        key = (record_type, str(record_id))
+        fetching = self._fetching.setdefault(key, [0, 0])
+        fetching[0] += 1
+        invalidations = fetching[1]
+        try:
+            record = await fetch()
+        finally:
+            fetching[0] -= 1
+            if not fetching[0]:
+                del self._fetching[key]
+        # Invalidated while in flight: the record may predate that write, so serve it uncached.
+        if fetching[1] == invalidations:
+            self.put(record_type, record_id, record)
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._cache),
+            "bytes": self._cache.currsize,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def parse_table_ttls(spec: str) -> Dict[str, float]:
+    """Parse ``"customer=300,transaction=15"`` into a table to TTL mapping."""
+    ttls = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        table, _, ttl = item.partition("=")
+        ttls[table.strip().lower()] = float(ttl)
+    return ttls
+
+
+class QueryResultCache:
+    """Cache of SuiteQL result pages keyed by normalized query, limit and offset.
+
+    Each entry lives for the shortest TTL among the tables the query reads, so
+    volatile tables such as ``transaction`` can expire sooner than reference data.
+    A TTL of zero for any referenced table disables caching for that query, and
+    so does a query whose tables could not be determined.
+    """
+
+    def __init__(self, default_ttl: float = 30.0, table_ttls: Optional[Mapping[str, float]] = None,
+                 max_bytes: int = 32 * 1024 * 1024):
+        self.default_ttl = default_ttl
+        self.table_ttls = dict(table_ttls or {})
+        # Values are (ttl, tables, result) so expiry and invalidation need no side index.
+        self._cache: TLRUCache = TLRUCache(maxsize=max_bytes, ttu=self._expires_at, getsizeof=self._size)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def ttl_for(self, tables: Iterable[str]) -> float:
+        return min((self.table_ttls.get(table, self.default_ttl) for table in tables), default=self.default_ttl)
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        result = self._cache.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result[2] if result is not None else None
+
+    def put(self, key: Tuple, tables: FrozenSet[str], result: Dict[str, Any]) -> None:
+        ttl = self.ttl_for(tables)
+        # Without the tables it reads, no write would ever invalidate the entry.
+        if ttl <= 0 or not tables:
+            return
+        try:
+            self._cache[key] = (ttl, tables, result)
+        except ValueError:
+            logger.debug("SuiteQL result too large to cache")
+
+    def invalidate_table(self, table: str) -> None:
+        table = table.lower()
+        for key, (_, tables, _) in list(self._cache.items()):
+            if table in tables:
+                self._cache.pop(key, None)
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._cache),
+            "bytes": self._cache.currsize,
+        }
+
+    @staticmethod
+    def _expires_at(key: Tuple, value: Tuple, now: float) -> float:
+        return now + value[0]
+
+    @staticmethod
+    def _size(value: Tuple) -> int:
+        return estimate_size(value[2])
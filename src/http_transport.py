@@ -0,0 +1,154 @@
+import hmac
+import importlib.metadata
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, Callable, Optional
+
+import anyio
+from mcp import types
+from mcp.server.fastmcp import FastMCP
+from mcp.server.lowlevel import Server
+from pydantic import ValidationError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Mount, Route
+
+from logger import logger
+from metrics import metrics
+
+# Paths served without an API key, for load balancer health checks.
+PUBLIC_PATHS = frozenset({"/health"})
+
+# Sent on the client's behalf to open the session that answers one POST.
+_INITIALIZE = types.JSONRPCMessage(types.JSONRPCRequest(
+    jsonrpc="2.0", id="http-transport-initialize", method="initialize",
+    params=types.InitializeRequestParams(
+        protocolVersion=types.LATEST_PROTOCOL_VERSION,
+        capabilities=types.ClientCapabilities(),
+        clientInfo=types.Implementation(name="mcp-netsuite-http", version="1.0"),
+    ).model_dump(by_alias=True, mode="json", exclude_none=True),
+))
+_INITIALIZED = types.JSONRPCMessage(types.JSONRPCNotification(jsonrpc="2.0", method="notifications/initialized"))
+
+
+class APIKeyMiddleware:
+    """Reject every HTTP request that does not carry the server's API key.
+
+    The key is read from ``Authorization: Bearer <key>`` or ``X-API-Key`` and
+    compared in constant time. With no key configured every request is refused.
+    """
+
+    def __init__(self, app, api_key: str):
+        self.app = app
+        self.api_key = api_key.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] not in PUBLIC_PATHS:
+            headers = dict(scope["headers"])
+            key = headers.get(b"x-api-key")
+            if key is None:
+                scheme, _, token = headers.get(b"authorization", b"").partition(b" ")
+                key = token.strip() if scheme.lower() == b"bearer" else b""
+            if not self.api_key or not hmac.compare_digest(key, self.api_key):
+                metrics.inc("mcp_http_unauthorized_total")
+                response = JSONResponse({"error": "Invalid or missing API key"}, status_code=401,
+                                        headers={"WWW-Authenticate": "Bearer"})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def lowlevel_server(server: FastMCP) -> Server:
+    """The low-level server that FastMCP registers its handlers on.
+
+    FastMCP has no public accessor for it, so it is read from a private
+    attribute; an mcp release that moves it fails here, when the app is built.
+    """
+    lowlevel = getattr(server, "_mcp_server", None)
+    if not isinstance(lowlevel, Server):
+        raise RuntimeError(f"The HTTP transport does not support mcp {importlib.metadata.version('mcp')}: "
+                           "FastMCP no longer keeps its low-level server in _mcp_server")
+    return lowlevel
+
+
+async def _reply(stream, request_id: types.RequestId) -> Optional[types.JSONRPCMessage]:
+    """The response or error to ``request_id``, skipping notifications sent before it."""
+    async for sent in stream:
+        if isinstance(sent.root, (types.JSONRPCResponse, types.JSONRPCError)) and sent.root.id == request_id:
+            return sent
+    return None
+
+
+async def handle_message(lowlevel: Server, message: types.JSONRPCMessage) -> Optional[types.JSONRPCMessage]:
+    """Answer one JSON-RPC message with a short-lived server session.
+
+    Returns the response to a request, or None for notifications. Every POST
+    stands alone, so the session is initialized on the client's behalf and
+    there is no protocol version negotiation. Progress notifications sent
+    while the request runs are dropped, since a JSON response carries only
+    the result.
+    """
+    if not isinstance(message.root, types.JSONRPCRequest):
+        return None
+    client_send, server_read = anyio.create_memory_object_stream(2)
+    server_write, client_read = anyio.create_memory_object_stream(16)
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(lowlevel.run, server_read, server_write, lowlevel.create_initialization_options())
+        await client_send.send(_INITIALIZE)
+        initialized = await _reply(client_read, _INITIALIZE.root.id)
+        if initialized is None or not isinstance(initialized.root, types.JSONRPCResponse):
+            raise RuntimeError(f"MCP session did not initialize: {initialized}")
+        await client_send.send(_INITIALIZED)
+        await client_send.send(message)
+        reply = await _reply(client_read, message.root.id)
+        # The session does not end when its input does; it has answered, so stop it.
+        tg.cancel_scope.cancel()
+    return reply
+
+
+def create_app(server: FastMCP, resources: Callable[[], AsyncContextManager[Any]], api_key: str) -> Starlette:
+    """HTTP transport for ``server``.
+
+    ``POST /mcp`` answers each JSON-RPC message statelessly, so any worker can
+    serve any request. ``/sse`` and ``/messages/`` speak the MCP HTTP+SSE
+    transport, whose sessions live in one worker. ``resources`` is entered for
+    the lifetime of the worker and keeps the pooled client and caches open
+    across sessions.
+    """
+    lowlevel = lowlevel_server(server)
+
+    async def mcp_endpoint(request: Request) -> Response:
+        try:
+            message = types.JSONRPCMessage.model_validate_json(await request.body())
+        except ValidationError as e:
+            error = {"code": types.PARSE_ERROR, "message": f"Invalid JSON-RPC message: {e.error_count()} errors"}
+            return JSONResponse({"jsonrpc": "2.0", "id": None, "error": error}, status_code=400)
+        reply = await handle_message(lowlevel, message)
+        if reply is None:
+            return Response(status_code=202)
+        return JSONResponse(reply.model_dump(by_alias=True, mode="json", exclude_none=True))
+
+    async def metrics_endpoint(request: Request) -> Response:
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    async def health(request: Request) -> Response:
+        return PlainTextResponse("ok\n")
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        async with resources():
+            logger.info("HTTP transport ready")
+            yield
+
+    sse = server.sse_app()
+    app = Starlette(
+        routes=[
+            Route("/mcp", mcp_endpoint, methods=["POST"]),
+            Route("/metrics", metrics_endpoint, methods=["GET"]),
+            Route("/health", health, methods=["GET"]),
+            Mount("/", routes=sse.routes),
+        ],
+        lifespan=lifespan,
+    )
+    app.add_middleware(APIKeyMiddleware, api_key=api_key)
+    return app
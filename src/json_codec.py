@@ -0,0 +1,79 @@
+import json
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # optional; pydantic-core's encoder is the fallback
+    orjson = None
+
+
+class RawJSON(Mapping):
+    """A JSON object kept as the bytes it arrived in.
+
+    It is decoded on the first key access, and serialized by passing the
+    original bytes through, so a response that is only forwarded to the
+    client is never decoded or re-encoded. Read-only, so it can be shared
+    between cache readers and coalesced callers.
+    """
+
+    __slots__ = ("raw", "_data")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._data = None
+
+    @property
+    def data(self) -> Any:
+        if self._data is None:
+            self._data = loads(self.raw)
+        return self._data
+
+    @property
+    def decoded(self) -> bool:
+        return self._data is not None
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"RawJSON({self.raw[:80]!r}{'...' if len(self.raw) > 80 else ''})"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, RawJSON):
+        return orjson.Fragment(value.raw) if hasattr(orjson, "Fragment") else value.data
+    try:
+        # Models, sets, decimals and the like, as pydantic-core would encode them.
+        return pydantic_core.to_jsonable_python(value)
+    except pydantic_core.PydanticSerializationError:
+        return str(value)
+
+
+def _fallback(value: Any) -> Any:
+    if isinstance(value, RawJSON):
+        return value.data
+    return str(value)
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """Encode compact JSON, embedding ``RawJSON`` bytes as they are; unknown types become strings."""
+    if isinstance(value, RawJSON):
+        return value.raw
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return pydantic_core.to_json(value, fallback=_fallback)
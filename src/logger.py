@@ -1,8 +1,105 @@
+"""Logging for the NetSuite MCP server.
+
+Log calls only enqueue the record. A background ``QueueListener`` thread formats
+and writes it to stderr, or to ``NETSUITE_LOG_FILE`` when set. Stdout is the MCP
+protocol channel in stdio transport and must never receive log output.
+
+* ``NETSUITE_LOG_LEVEL``: minimum level (default ``INFO``).
+* ``NETSUITE_LOG_SAMPLE_RATE``: fraction of high-volume INFO lines kept, i.e. those
+  logged with ``extra=SAMPLED`` (default ``1.0``).
+* ``NETSUITE_LOG_MAX_LENGTH``: messages are truncated to this many characters
+  (default ``500``).
+"""
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)  
-handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
\ No newline at end of file
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_LEVEL = os.getenv("NETSUITE_LOG_LEVEL", "INFO").upper()
+SAMPLE_RATE = float(os.getenv("NETSUITE_LOG_SAMPLE_RATE", "1.0"))
+MAX_MESSAGE_LENGTH = int(os.getenv("NETSUITE_LOG_MAX_LENGTH", "500"))
+
+# Pass as ``extra=SAMPLED`` on per-request INFO lines that may be sampled away.
+SAMPLED = {"sampled": True}
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Formats lazily-built messages in the listener thread and caps their length."""
+
+    def __init__(self, fmt: str = LOG_FORMAT, max_length: int = MAX_MESSAGE_LENGTH):
+        super().__init__(fmt)
+        self.max_length = max_length
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = record.message
+        if len(message) > self.max_length:
+            record.message = f"{message[:self.max_length]}... ({len(message) - self.max_length} chars truncated)"
+        return super().formatMessage(record)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a ``rate`` fraction of records marked as sampled; everything else passes."""
+
+    def __init__(self, rate: float = SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or not getattr(record, "sampled", False) or record.levelno > logging.INFO:
+            return True
+        return random.random() < self.rate
+
+
+_MUTABLE_ARGS = (list, dict, set, bytearray)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records as-is, so message formatting happens on the listener thread.
+
+    Arguments are formatted later, on that thread, so callers must not mutate them
+    after the log call. Lists, dicts and sets are the exception: a record carrying
+    one is formatted before it is enqueued.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if any(isinstance(value, _MUTABLE_ARGS) for value in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+
+def _output_handler() -> logging.Handler:
+    log_file = os.getenv("NETSUITE_LOG_FILE")
+    handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TruncatingFormatter())
+    return handler
+
+
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler = LazyQueueHandler(_queue)
+_queue_handler.addFilter(SamplingFilter())
+listener = logging.handlers.QueueListener(_queue, _output_handler(), respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    log = logging.getLogger(name)
+    if _queue_handler not in log.handlers:
+        log.setLevel(LOG_LEVEL)
+        log.addHandler(_queue_handler)
+        # Keep records out of the root logger, which FastMCP configures separately.
+        log.propagate = False
+    return log
+
+
+logger = get_logger(__name__)
+# httpx logs an INFO line per request; keep it off the root logger's synchronous handler.
+get_logger("httpx")
@@ -0,0 +1,173 @@
+import asyncio
+import bisect
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from logger import logger
+
+# Latency buckets in seconds, shared by every histogram.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound if bound != float("inf") else BUCKETS[-2]
+        return BUCKETS[-2]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class ToolCall:
+    """Timing state of one tool call, shared between the server and the client."""
+
+    __slots__ = ("started", "entered", "upstream")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.entered: Optional[float] = None
+        self.upstream = 0.0
+
+
+current_call: contextvars.ContextVar[Optional[ToolCall]] = contextvars.ContextVar("current_call", default=None)
+
+
+class Metrics:
+    """In-process registry of histograms, counters and gauges."""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register a callable returning ``(name, labels, value)`` samples read at scrape time."""
+        self.collectors.append(collector)
+
+    @contextmanager
+    def upstream(self, method: str) -> Iterator[None]:
+        """Time a NetSuite request and charge it to the current tool call."""
+        self.add_gauge("netsuite_requests_in_flight", 1)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.add_gauge("netsuite_requests_in_flight", -1)
+            self.observe("netsuite_request_seconds", elapsed, method=method)
+            call = current_call.get()
+            if call is not None:
+                call.upstream += elapsed
+
+    def snapshot(self) -> Dict[str, Any]:
+        def group(items, render):
+            grouped: Dict[str, List[Dict[str, Any]]] = {}
+            for (name, labels), value in sorted(items, key=lambda item: item[0]):
+                grouped.setdefault(name, []).append({**dict(labels), **render(value)})
+            return grouped
+
+        return {
+            "histograms": group(self.histograms.items(), lambda h: h.summary()),
+            "counters": group(self.counters.items(), lambda v: {"value": v}),
+            "gauges": group(self.gauges.items(), lambda v: {"value": v}),
+        }
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        for (name, labels), value in sorted(self.counters.items(), key=lambda item: item[0]):
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), value in sorted(self.gauges.items(), key=lambda item: item[0]):
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+metrics = Metrics()
+
+
+async def serve_prometheus(port: int, host: str = "127.0.0.1") -> asyncio.AbstractServer:
+    """Serve ``GET /metrics`` in Prometheus text format on a side port, without authentication."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            if request_line.split(b" ")[1:2] == [b"/metrics"]:
+                body = metrics.render_prometheus().encode()
+                status = "200 OK"
+            else:
+                body, status = b"not found\n", "404 Not Found"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("Serving Prometheus metrics on %s:%s/metrics", host, port)
+    return server
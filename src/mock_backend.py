@@ -0,0 +1,801 @@
+import bisect
+import copy
+import json
+import operator
+import random
+import re
+import time
+from array import array
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from mock_fixture import BinaryFixture
+from record_types import TRANSACTION_TYPE_CODES
+
+SUITEQL_KEY = "query/v1/suiteql"
+
+
+def now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def _is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and "id" in value
+
+
+def _norm(value: Any) -> Optional[str]:
+    """Equality key shared by the field indexes and query literals."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _sort_key(value: Any) -> Tuple:
+    if value.__class__ is float or value.__class__ is int:
+        return (0, value)
+    if value is None:
+        return (2,)
+    number = _number(value)
+    if number is not None:
+        return (0, number)
+    return (1, str(value))
+
+
+def _index(index: Dict[str, Union[int, List[int]]], key: str, row: int) -> None:
+    bucket = index.get(key)
+    if bucket is None:
+        index[key] = row
+    elif bucket.__class__ is int:
+        index[key] = [bucket, row]
+    else:
+        bucket.append(row)
+
+
+def _unindex(index: Dict[str, Union[int, List[int]]], key: str, row: int) -> None:
+    bucket = index[key]
+    if bucket.__class__ is int:
+        del index[key]
+    else:
+        bucket.remove(row)
+
+
+class RecordStore:
+    """Columnar storage for the records of one type.
+
+    Each field is one list, aligned with ``ids``; records never materialize as
+    dicts until they are read. Reference fields (``{"id": ...}``) are stored as
+    the bare id. Hash indexes (for equality) and sorted indexes (for ORDER BY) are
+    built per field on first use and kept up to date on writes.
+    """
+
+    __slots__ = ("record_type", "ids", "positions", "columns", "names", "refs", "indexes", "orders", "next_id")
+
+    def __init__(self, record_type: str):
+        self.record_type = record_type
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.columns: Dict[str, List[Any]] = {}
+        self.names: Dict[str, str] = {}
+        self.refs: Set[str] = set()
+        # Hash index buckets are a bare row number until a second row shares the value.
+        self.indexes: Dict[str, Dict[str, Union[int, List[int]]]] = {}
+        self.orders: Dict[str, List[int]] = {}
+        self.next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def column(self, name: str) -> Optional[str]:
+        """Resolve a case-insensitive SuiteQL column name to the stored field name."""
+        return self.names.get(name.lower())
+
+    def _add_column(self, name: str, ref: bool) -> List[Any]:
+        values = self.columns[name] = [None] * len(self.ids)
+        self.names[name.lower()] = name
+        if ref:
+            self.refs.add(name)
+        return values
+
+    def _set(self, row: int, name: str, value: Any) -> None:
+        values = self.columns.get(name)
+        if values is None:
+            values = self._add_column(name, _is_ref(value))
+        if name in self.refs:
+            if _is_ref(value):
+                value = value["id"]
+            elif value is not None:
+                self._demote(name)
+        index = self.indexes.get(name)
+        if index is not None:
+            # Hash indexes hold non-null values only; equality never matches NULL.
+            if values[row] is not None:
+                _unindex(index, _norm(values[row]), row)
+            if value is not None:
+                _index(index, _norm(value), row)
+        rows = self.orders.get(name)
+        if rows is not None:
+            key = lambda r: _sort_key(values[r])
+            position = bisect.bisect_left(rows, _sort_key(values[row]), key=key)
+            while rows[position] != row:
+                position += 1
+            del rows[position]
+            values[row] = value
+            bisect.insort(rows, row, key=key)
+        values[row] = value
+
+    def _demote(self, name: str) -> None:
+        """Store a field that turned out not to hold plain references as-is from now on."""
+        self.refs.discard(name)
+        self.indexes.pop(name, None)
+        self.orders.pop(name, None)
+        values = self.columns[name]
+        values[:] = [None if value is None else {"id": value} for value in values]
+
+    def _claim_id(self, record_id: Optional[str]) -> str:
+        if record_id is None:
+            record_id = str(self.next_id)
+        if record_id.isdigit():
+            self.next_id = max(self.next_id, int(record_id) + 1)
+        return record_id
+
+    def insert(self, record: Dict[str, Any]) -> str:
+        record_id = self._claim_id(str(record["id"]) if record.get("id") is not None else None)
+        if record_id in self.positions:
+            raise ValueError(f"Duplicate {self.record_type} id: {record_id}")
+        row = len(self.ids)
+        self.ids.append(record_id)
+        self.positions[record_id] = row
+        for values in self.columns.values():
+            values.append(None)
+        for name, rows in self.orders.items():
+            # Every field is still NULL, which sorts last; only the id is known yet.
+            if name == "id":
+                bisect.insort(rows, row, key=lambda r: _sort_key(self.ids[r]))
+            else:
+                rows.append(row)
+        for name, value in record.items():
+            if name != "id":
+                self._set(row, name, value)
+        return record_id
+
+    def extend(self, count: int, columns: Dict[str, List[Any]], refs: Iterable[str] = ()) -> List[str]:
+        """Bulk-append ``count`` records given as whole columns; ids are assigned sequentially.
+
+        Values must already be in stored form, i.e. bare ids for the ``refs`` columns.
+        """
+        ids = [str(n) for n in range(self.next_id, self.next_id + count)]
+        self._append(ids, columns, refs)
+        return ids
+
+    def load(self, records: List[Dict[str, Any]]) -> None:
+        """Bulk-append decoded records, keeping their ids."""
+        columns: Dict[str, List[Any]] = {}
+        refs = []
+        for name in dict.fromkeys(name for record in records for name in record if name != "id"):
+            values = [record.get(name) for record in records]
+            if all(_is_ref(value) for value in values if value is not None) and (
+                    name not in self.columns or name in self.refs):
+                values = [None if value is None else value["id"] for value in values]
+                refs.append(name)
+            elif name in self.refs:
+                self._demote(name)
+            columns[name] = values
+        self._append([str(record["id"]) for record in records], columns, refs)
+
+    def _append(self, ids: List[str], columns: Dict[str, List[Any]], refs: Iterable[str]) -> None:
+        for name in columns:
+            if name not in self.columns:
+                self._add_column(name, name in refs)
+        first = len(self.ids)
+        self.ids.extend(ids)
+        self.positions.update(zip(ids, range(first, first + len(ids))))
+        numeric = [int(record_id) for record_id in ids if record_id.isdigit()]
+        if numeric:
+            self.next_id = max(self.next_id, max(numeric) + 1)
+        for name, values in self.columns.items():
+            values.extend(columns.get(name) or [None] * len(ids))
+        self.indexes.clear()
+        self.orders.clear()
+
+    def update(self, record_id: str, data: Dict[str, Any]) -> None:
+        row = self.positions[record_id]
+        for name, value in data.items():
+            if name != "id":
+                self._set(row, name, value)
+
+    def value(self, row: int, name: str) -> Any:
+        if name == "id":
+            return self.ids[row]
+        return self.columns[name][row]
+
+    def record(self, row: int) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"id": self.ids[row]}
+        for name, values in self.columns.items():
+            value = values[row]
+            if value is None:
+                continue
+            if name in self.refs:
+                value = {"id": value}
+            elif isinstance(value, (dict, list)):
+                # Callers may mutate what they get back; the store must not change with them.
+                value = copy.deepcopy(value)
+            record[name] = value
+        return record
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        row = self.positions.get(record_id)
+        return None if row is None else self.record(row)
+
+    def lookup(self, name: str, value: Any) -> List[int]:
+        """Rows whose ``name`` field equals ``value``, through the field's hash index."""
+        if name == "id":
+            row = self.positions.get(_norm(value))
+            return [] if row is None else [row]
+        index = self.indexes.get(name)
+        if index is None:
+            index = self.indexes[name] = {}
+            get = index.get
+            # Inlined _index(); this loop runs once per row of the store.
+            for row, field_value in enumerate(self.columns[name]):
+                if field_value is None:
+                    continue
+                key = field_value if field_value.__class__ is str else _norm(field_value)
+                bucket = get(key)
+                if bucket is None:
+                    index[key] = row
+                elif bucket.__class__ is int:
+                    index[key] = [bucket, row]
+                else:
+                    bucket.append(row)
+        bucket = index.get(_norm(value))
+        if bucket is None:
+            return []
+        return [bucket] if bucket.__class__ is int else list(bucket)
+
+    def sorted_rows(self, name: str) -> List[int]:
+        """All rows ordered by ``name`` ascending, NULLs last, through the field's sorted index."""
+        rows = self.orders.get(name)
+        if rows is None:
+            values = self.ids if name == "id" else self.columns[name]
+            try:
+                if not all(value.__class__ in (int, float) for value in values):
+                    raise TypeError
+                # Plain numbers compare natively, which is far cheaper than a key function.
+                rows = sorted(range(len(values)), key=values.__getitem__)
+            except TypeError:
+                rows = sorted(range(len(values)), key=lambda row: _sort_key(values[row]))
+            self.orders[name] = rows
+        return rows
+
+
+class Condition(NamedTuple):
+    field: str
+    op: str
+    value: Any
+
+
+class MockQuery(NamedTuple):
+    columns: Optional[Tuple[Tuple[str, str], ...]]  # (field, output name); None selects every field
+    table: str
+    where: Tuple[Tuple[Condition, ...], ...]  # OR of ANDs
+    order: Tuple[Tuple[str, bool], ...]  # (field, descending)
+    limit: Optional[int]
+
+
+_TOKEN = re.compile(r"\s*('(?:[^']|'')*'|-?\d+(?:\.\d+)?|<>|!=|<=|>=|[=<>(),*;]|[\w.]+)")
+_COMPARISONS = {"=", "!=", "<>", "<", "<=", ">", ">="}
+
+
+def _tokenize(query: str) -> Optional[List[str]]:
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if match is None:
+            return None
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def _literal(token: str) -> Any:
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    if re.fullmatch(r"-?\d+", token):
+        return int(token)
+    if re.fullmatch(r"-?\d+\.\d+", token):
+        return float(token)
+    raise ValueError(token)
+
+
+def _field(token: str) -> str:
+    if not re.fullmatch(r"[\w.]+", token):
+        raise ValueError(token)
+    return token.rsplit(".", 1)[-1]
+
+
+@lru_cache(maxsize=1024)
+def compile_query(query: str) -> Optional[MockQuery]:
+    """Parse the subset of SuiteQL the mock backend evaluates, or None when unsupported.
+
+    Supported: ``SELECT * | col [AS name], ... FROM table [alias]`` with an
+    optional ``WHERE`` of ``=``, ``!=``, ``<``, ``>``, ``LIKE`` and ``IS [NOT] NULL``
+    comparisons joined by ``AND`` / ``OR`` (no parentheses), ``ORDER BY`` and
+    ``LIMIT n`` or ``FETCH FIRST n ROWS ONLY``. ``TO_CHAR(col, fmt)`` columns and
+    ``TO_DATE`` / ``TO_TIMESTAMP`` literals are accepted for ISO 8601 dates, which
+    the mock stores as text and compares as such.
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        return None
+    upper = [token.upper() for token in tokens]
+    position = 0
+
+    def take(*expected: str) -> bool:
+        nonlocal position
+        if upper[position:position + len(expected)] == list(expected):
+            position += len(expected)
+            return True
+        return False
+
+    def next_token() -> str:
+        nonlocal position
+        if position >= len(tokens):
+            raise ValueError("unexpected end of query")
+        position += 1
+        return tokens[position - 1]
+
+    def format_argument() -> None:
+        if take(","):
+            _literal(next_token())
+        if not take(")"):
+            raise ValueError("expected )")
+
+    def value() -> Any:
+        token = next_token()
+        if token.upper() in ("TO_DATE", "TO_TIMESTAMP") and take("("):
+            text = _literal(next_token())
+            format_argument()
+            return text
+        return _literal(token)
+
+    try:
+        if not take("SELECT"):
+            return None
+        columns: Optional[List[Tuple[str, str]]] = None
+        if not take("*"):
+            columns = []
+            while True:
+                name = next_token()
+                if name.upper() == "TO_CHAR" and take("("):
+                    name = next_token()
+                    format_argument()
+                field = _field(name)
+                output = name.rsplit(".", 1)[-1]
+                if take("AS"):
+                    output = next_token()
+                columns.append((field, output))
+                if not take(","):
+                    break
+        if not take("FROM"):
+            return None
+        table = _field(next_token()).lower()
+        if position < len(tokens) and upper[position] not in ("WHERE", "ORDER", "LIMIT", "FETCH", ";"):
+            next_token()  # table alias
+        where: List[Tuple[Condition, ...]] = []
+        if take("WHERE"):
+            group: List[Condition] = []
+            while True:
+                field = _field(next_token())
+                if take("IS", "NOT", "NULL"):
+                    group.append(Condition(field, "IS NOT NULL", None))
+                elif take("IS", "NULL"):
+                    group.append(Condition(field, "IS NULL", None))
+                elif take("NOT", "LIKE"):
+                    group.append(Condition(field, "NOT LIKE", _literal(next_token())))
+                elif take("LIKE"):
+                    group.append(Condition(field, "LIKE", _literal(next_token())))
+                else:
+                    op = next_token()
+                    if op not in _COMPARISONS:
+                        return None
+                    group.append(Condition(field, "!=" if op == "<>" else op, value()))
+                if take("AND"):
+                    continue
+                where.append(tuple(group))
+                group = []
+                if not take("OR"):
+                    break
+        order: List[Tuple[str, bool]] = []
+        if take("ORDER", "BY"):
+            while True:
+                field = _field(next_token())
+                descending = take("DESC")
+                if not descending:
+                    take("ASC")
+                order.append((field, descending))
+                if not take(","):
+                    break
+        limit = None
+        if take("LIMIT"):
+            limit = int(next_token())
+        elif take("FETCH", "FIRST"):
+            limit = int(next_token())
+            if not (take("ROWS", "ONLY") or take("ROW", "ONLY")):
+                return None
+        take(";")
+        if position != len(tokens):
+            return None
+    except ValueError:
+        return None
+    return MockQuery(tuple(columns) if columns is not None else None, table, tuple(where), tuple(order), limit)
+
+
+@lru_cache(maxsize=256)
+def _like(pattern: str) -> "re.Pattern[str]":
+    # NetSuite matches LIKE case-insensitively.
+    regex = "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern)
+    return re.compile(regex, re.IGNORECASE | re.DOTALL)
+
+
+_COMPARE = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def _predicate(condition: Condition) -> Callable[[Any], bool]:
+    """Compile one condition into a test applied to a column value."""
+    op, literal = condition.op, condition.value
+    if op == "IS NULL":
+        return lambda value: value is None
+    if op == "IS NOT NULL":
+        return lambda value: value is not None
+    if op in ("LIKE", "NOT LIKE"):
+        pattern = str(literal)
+        inner = pattern.strip("%")
+        if "%" not in inner and "_" not in inner and pattern != inner:
+            # Prefix, suffix and substring patterns skip the regex engine.
+            inner = inner.lower()
+            if pattern.startswith("%") and pattern.endswith("%"):
+                like = lambda value: inner in str(value).lower()
+            elif pattern.endswith("%"):
+                like = lambda value: str(value).lower().startswith(inner)
+            else:
+                like = lambda value: str(value).lower().endswith(inner)
+        else:
+            regex = _like(pattern)
+            like = lambda value: regex.fullmatch(str(value)) is not None
+        if op == "NOT LIKE":
+            return lambda value: value is not None and not like(value)
+        return lambda value: value is not None and like(value)
+    key = _norm(literal)
+    if op == "=":
+        return lambda value: value == key or (value is not None and _norm(value) == key)
+    if op == "!=":
+        return lambda value: value is not None and value != key and _norm(value) != key
+    compare = _COMPARE[op]
+    number = _number(literal)
+    if number is not None:
+        def numeric(value: Any) -> bool:
+            value = _number(value)
+            return value is not None and compare(value, number)
+        return numeric
+    return lambda value: value is not None and compare(str(value), key)
+
+
+class _Source(NamedTuple):
+    """One store read by a query, with constant columns such as ``transaction.type``."""
+
+    store: RecordStore
+    constants: Dict[str, Any]
+
+    def resolve(self, name: str) -> Optional[str]:
+        if name.lower() == "id":
+            return "id"
+        return self.store.column(name)
+
+    def value(self, row: int, name: str) -> Any:
+        if name.lower() in self.constants:
+            return self.constants[name.lower()]
+        field = self.resolve(name)
+        return None if field is None else self.store.value(row, field)
+
+    def filter(self, group: Tuple[Condition, ...]) -> List[int]:
+        """Rows matching every condition, starting from an equality index when there is one."""
+        rows: Optional[List[int]] = None
+        pending = []
+        for condition in group:
+            test = _predicate(condition)
+            name = condition.field.lower()
+            field = self.resolve(name) if name not in self.constants else None
+            if field is None:
+                # Constant or unknown column: the same value for every row.
+                if not test(self.constants.get(name)):
+                    return []
+            elif condition.op == "=" and rows is None:
+                rows = list(self.store.lookup(field, condition.value))
+            else:
+                pending.append((field, test))
+        for field, test in pending:
+            values = self.store.ids if field == "id" else self.store.columns[field]
+            if rows is None:
+                rows = [row for row, value in enumerate(values) if test(value)]
+            else:
+                rows = [row for row in rows if test(values[row])]
+        return list(range(len(self.store))) if rows is None else rows
+
+    def ordered(self, rows: List[int], order: Tuple[Tuple[str, bool], ...]) -> List[int]:
+        fields = [(self.resolve(name) if name.lower() not in self.constants else None, descending)
+                  for name, descending in order]
+        fields = [(field, descending) for field, descending in fields if field is not None]
+        if len(fields) == 1 and len(rows) * 16 > len(self.store):
+            # Walk the field's sorted index instead of sorting most of the store.
+            field, descending = fields[0]
+            ordered = self.store.sorted_rows(field)
+            if descending:
+                ordered = ordered[::-1]
+            if len(rows) < len(ordered):
+                wanted = set(rows)
+                ordered = [row for row in ordered if row in wanted]
+            return ordered
+        for field, descending in reversed(fields):
+            values = self.store.ids if field == "id" else self.store.columns[field]
+            rows = sorted(rows, key=lambda row: _sort_key(values[row]), reverse=descending)
+        return rows
+
+    def rows(self, where: Tuple[Tuple[Condition, ...], ...]) -> List[int]:
+        if not where:
+            return list(range(len(self.store)))
+        if len(where) == 1:
+            return self.filter(where[0])
+        matched: Set[int] = set()
+        for group in where:
+            matched.update(self.filter(group))
+        return sorted(matched)
+
+
+class MockBackend:
+    """In-process NetSuite mock that persists writes and answers simple SuiteQL.
+
+    Records from the fixture's ``record/v1/<type>/<id>`` entries are loaded into
+    one ``RecordStore`` per type. Every other fixture entry (the metadata catalog,
+    canned SuiteQL results) is served verbatim, and SuiteQL that the evaluator
+    does not support falls back to the canned ``query/v1/suiteql`` payload.
+
+    With a ``BinaryFixture`` behind it nothing is loaded up front: single
+    records are decoded into their store on first access, and a whole type is
+    loaded the first time a SuiteQL query reads its table.
+    """
+
+    def __init__(self, canned: Optional[Dict[str, Any]] = None, fixture: Optional[BinaryFixture] = None):
+        self.canned: Dict[str, Any] = canned or {}
+        self.stores: Dict[str, RecordStore] = {}
+        self.fixture = fixture
+        self._loaded: Set[str] = set()
+
+    @classmethod
+    def from_fixture(cls, mocks: Dict[str, Any]) -> "MockBackend":
+        backend = cls()
+        for key, value in mocks.items():
+            parts = key.split("/")
+            if len(parts) == 4 and parts[:2] == ["record", "v1"] and isinstance(value, dict):
+                backend.store(parts[2]).insert({**value, "id": parts[3]})
+            else:
+                backend.canned[key] = value
+        return backend
+
+    @classmethod
+    def open(cls, path: str) -> "MockBackend":
+        """Open a binary fixture lazily, or load a JSON fixture whole."""
+        if BinaryFixture.is_binary(path):
+            return cls(fixture=BinaryFixture(path))
+        with open(path, "r") as f:
+            return cls.from_fixture(json.load(f))
+
+    def store(self, record_type: str) -> RecordStore:
+        key = record_type.lower()
+        store = self.stores.get(key)
+        if store is None:
+            info = self.fixture.types.get(key) if self.fixture is not None else None
+            store = self.stores[key] = RecordStore(info["name"] if info else record_type)
+            if info:
+                store.next_id = info["next_id"]
+        return store
+
+    def stats(self) -> Dict[str, int]:
+        """Records held in memory per type; types still only in the fixture are not counted."""
+        return {store.record_type: len(store) for store in self.stores.values()}
+
+    def load(self, record_type: str) -> None:
+        """Decode every fixture record of a type that is not in memory yet."""
+        key = record_type.lower()
+        if self.fixture is None or key in self._loaded or key not in self.fixture.types:
+            return
+        store = self.store(key)
+        store.load([record for record in self.fixture.records(key) if str(record["id"]) not in store.positions])
+        self._loaded.add(key)
+
+    def load_all(self) -> None:
+        if self.fixture is None:
+            return
+        for key in self.fixture.types:
+            self.load(key)
+        for key in self.fixture.canned_keys():
+            self._canned(key)
+
+    def _canned(self, key: str) -> Optional[Any]:
+        if key not in self.canned and self.fixture is not None:
+            value = self.fixture.canned(key)
+            if value is None:
+                return None
+            self.canned[key] = value
+        return self.canned.get(key)
+
+    def _find(self, record_type: str, record_id: str) -> Optional[RecordStore]:
+        """The store holding a record, decoding it from the fixture on first access."""
+        key = record_type.lower()
+        store = self.stores.get(key)
+        if store is not None and record_id in store.positions:
+            return store
+        if self.fixture is None or key in self._loaded:
+            return None
+        record = self.fixture.get(key, record_id)
+        if record is None:
+            return None
+        store = self.store(key)
+        store.insert(record)
+        return store
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        parts = key.split("/")
+        if len(parts) == 4 and parts[:2] == ["record", "v1"]:
+            store = self._find(parts[2], parts[3])
+            if store is not None:
+                return store.get(parts[3])
+        return self._canned(key)
+
+    def post(self, key: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if key == SUITEQL_KEY:
+            page = self.suiteql(data.get("q", ""), data.get("limit", 1000), data.get("offset", 0))
+            return page if page is not None else self._canned(key)
+        parts = key.split("/")
+        if len(parts) == 3 and parts[:2] == ["record", "v1"]:
+            store = self.store(parts[2])
+            record_id = store.insert({**data, "lastModifiedDate": now_iso()})
+            return {**store.get(record_id), "status": "created"}
+        return self._canned(key)
+
+    def patch(self, key: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        parts = key.split("/")
+        if len(parts) != 4 or parts[:2] != ["record", "v1"]:
+            return self._canned(key)
+        store = self._find(parts[2], parts[3])
+        if store is None:
+            raise ValueError(f"The record instance does not exist: {key}")
+        store.update(parts[3], {**data, "lastModifiedDate": now_iso()})
+        return {**store.get(parts[3]), "status": "updated"}
+
+    def _sources(self, table: str) -> Optional[List[_Source]]:
+        if table == "transaction":
+            for key in TRANSACTION_TYPE_CODES:
+                self.load(key)
+            return [_Source(self.stores[key], {"type": code})
+                    for key, code in TRANSACTION_TYPE_CODES.items() if key in self.stores]
+        self.load(table)
+        store = self.stores.get(table)
+        return [_Source(store, {})] if store is not None else None
+
+    def suiteql(self, query: str, limit: int = 1000, offset: int = 0) -> Optional[Dict[str, Any]]:
+        """Evaluate ``query`` against the stores; None when it cannot be answered here."""
+        parsed = compile_query(query)
+        if parsed is None:
+            return None
+        sources = self._sources(parsed.table)
+        if not sources:
+            return None
+        if len(sources) == 1:
+            # Work on bare row numbers; pairing them with the source is left to the page.
+            source = sources[0]
+            rows = source.rows(parsed.where)
+            if parsed.order:
+                rows = source.ordered(rows, parsed.order)
+            if parsed.limit is not None:
+                rows = rows[:parsed.limit]
+            total = len(rows)
+            page = [(source, row) for row in rows[offset:offset + limit]]
+        else:
+            matches = [(source, row) for source in sources for row in source.rows(parsed.where)]
+            # Stable sorts from the last key to the first honour mixed ASC / DESC.
+            for field, descending in reversed(parsed.order):
+                matches.sort(key=lambda match: _sort_key(match[0].value(match[1], field)), reverse=descending)
+            if parsed.limit is not None:
+                matches = matches[:parsed.limit]
+            total = len(matches)
+            page = matches[offset:offset + limit]
+        items = [self._project(source, row, parsed.columns) for source, row in page]
+        return {"links": [], "count": len(items), "hasMore": offset + len(items) < total, "items": items,
+                "offset": offset, "totalResults": total}
+
+    @staticmethod
+    def _project(source: _Source, row: int, columns: Optional[Tuple[Tuple[str, str], ...]]) -> Dict[str, Any]:
+        if columns is None:
+            return {**source.store.record(row), **source.constants}
+        record = {}
+        for field, output in columns:
+            value = source.value(row, field)
+            record[output] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        return record
+
+
+def generate_dataset(backend: MockBackend, customers: int, orders: Optional[int] = None,
+                     invoices: Optional[int] = None, seed: int = 0) -> None:
+    """Append synthetic customers, sales orders and invoices to ``backend``.
+
+    Columns are built whole and bulk-loaded, so a million records of each type
+    take seconds. ``orders`` and ``invoices`` default to ``customers``.
+    """
+    rng = random.Random(seed)
+    orders = customers if orders is None else orders
+    invoices = customers if invoices is None else invoices
+    names = ("Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay", "Wonka", "Tyrell")
+    suffixes = ("Corp", "Inc", "LLC", "Ltd", "Group")
+    states = ("CA", "NY", "TX", "WA", "IL", "FL", "MA", "CO")
+    # A pool of distinct timestamps keeps the column small while spreading records over a year.
+    base = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, 0))
+    stamps = [time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(base + minute * 60))
+              for minute in range(0, 365 * 24 * 60, 37)]
+
+    # Drawing whole columns from random bytes is several times faster than per-value calls.
+    def words(count: int) -> "array[int]":
+        return array("I", rng.randbytes(4 * count))
+
+    def pick(values: Sequence[Any], count: int) -> List[Any]:
+        size = len(values)
+        return [values[n % size] for n in words(count)]
+
+    def amounts(count: int, high: int) -> List[float]:
+        return [n % (high * 100) / 100 for n in words(count)]
+
+    customer_store = backend.store("customer")
+    customer_ids = customer_store.extend(customers, {
+        "companyName": [f"{name} {suffix} {n}" for n, (name, suffix) in
+                        enumerate(zip(pick(names, customers), pick(suffixes, customers)))],
+        "email": [f"contact{n}@example.com" for n in range(customers)],
+        "balance": amounts(customers, 50000),
+        "billState": pick(states, customers),
+        "subsidiary": pick(("1", "2", "3"), customers),
+        "lastModifiedDate": pick(stamps, customers),
+    }, refs=("subsidiary",))
+    if not customer_ids:
+        return
+    order_store = backend.store("salesOrder")
+    order_ids = order_store.extend(orders, {
+        "entity": pick(customer_ids, orders),
+        "status": pick(("pending", "approved", "billed", "closed"), orders),
+        "total": amounts(orders, 10000),
+        "lastModifiedDate": pick(stamps, orders),
+    }, refs=("entity",))
+    if not order_ids:
+        return
+    order_entities = order_store.columns["entity"][-len(order_ids):]
+    count = len(order_ids)
+    invoice_rows = [n % count for n in words(invoices)]
+    backend.store("invoice").extend(invoices, {
+        "entity": [order_entities[row] for row in invoice_rows],
+        "createdFrom": [order_ids[row] for row in invoice_rows],
+        "status": pick(("open", "paid"), invoices),
+        "total": amounts(invoices, 10000),
+        "lastModifiedDate": pick(stamps, invoices),
+    }, refs=("entity", "createdFrom"))
@@ -0,0 +1,147 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"NSMOCK01"
+_HEADER = struct.Struct("<8sQQ")  # magic, directory offset, directory length
+_POINTER = struct.Struct("<QI")  # record offset, record length
+_SEPARATORS = (",", ":")
+
+
+class BinaryFixture:
+    """Read-only mock dataset in an offset-indexed binary file, accessed through ``mmap``.
+
+    The file holds a header, the JSON-encoded records back to back, one sorted
+    table of fixed-width ``(id, offset, length)`` entries per record type, and a
+    small JSON directory. Opening reads only the header and the directory, so it
+    takes the same time whatever the dataset size. A record is found by binary
+    search over its type's table and decoded when it is requested; pages the
+    process never touches are never read from disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, offset, length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary mock fixture")
+        directory = json.loads(self._mmap[offset:offset + length])
+        # Keyed by lower-cased record type: name, count, table offset, key_size, next_id.
+        self.types: Dict[str, Dict[str, Any]] = directory["types"]
+        self._canned: Dict[str, Tuple[int, int]] = {key: tuple(value) for key, value in directory["canned"].items()}
+        # Records decoded and id-table entries compared, to check the access cost.
+        self.decoded = 0
+        self.probes = 0
+
+    @staticmethod
+    def is_binary(path: str) -> bool:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def canned_keys(self) -> List[str]:
+        return list(self._canned)
+
+    def canned(self, key: str) -> Optional[Any]:
+        pointer = self._canned.get(key)
+        return None if pointer is None else self._decode(*pointer)
+
+    def count(self, record_type: str) -> int:
+        info = self.types.get(record_type.lower())
+        return info["count"] if info else 0
+
+    def get(self, record_type: str, record_id: str) -> Optional[Dict[str, Any]]:
+        info = self.types.get(record_type.lower())
+        if info is None:
+            return None
+        key_size = info["key_size"]
+        key = record_id.encode()
+        if len(key) > key_size:
+            return None
+        key = key.ljust(key_size, b"\0")
+        table, width = info["table"], key_size + _POINTER.size
+        low, high = 0, info["count"]
+        while low < high:
+            middle = (low + high) // 2
+            position = table + middle * width
+            found = self._mmap[position:position + key_size]
+            self.probes += 1
+            if found == key:
+                return self._decode(*_POINTER.unpack_from(self._mmap, position + key_size))
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def records(self, record_type: str) -> Iterator[Dict[str, Any]]:
+        """Decode every record of a type, in id order."""
+        info = self.types.get(record_type.lower())
+        if info is None:
+            return
+        key_size = info["key_size"]
+        width = key_size + _POINTER.size
+        for position in range(info["table"], info["table"] + info["count"] * width, width):
+            yield self._decode(*_POINTER.unpack_from(self._mmap, position + key_size))
+
+    def _decode(self, offset: int, length: int) -> Any:
+        self.decoded += 1
+        return json.loads(self._mmap[offset:offset + length])
+
+
+def write_fixture(backend, path: str) -> None:
+    """Write the records and canned payloads of a ``MockBackend`` as a binary fixture."""
+    partial = f"{path}.partial"
+    with open(partial, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, 0, 0))
+        canned: Dict[str, List[int]] = {}
+        for key, value in backend.canned.items():
+            data = json.dumps(value, separators=_SEPARATORS).encode()
+            canned[key] = [f.tell(), len(data)]
+            f.write(data)
+        types: Dict[str, Dict[str, Any]] = {}
+        for lower, store in backend.stores.items():
+            entries = []
+            for row, record_id in enumerate(store.ids):
+                data = json.dumps(store.record(row), separators=_SEPARATORS).encode()
+                entries.append((record_id.encode(), f.tell(), len(data)))
+                f.write(data)
+            entries.sort()
+            key_size = max((len(key) for key, _, _ in entries), default=1)
+            types[lower] = {"name": store.record_type, "count": len(entries), "table": f.tell(),
+                            "key_size": key_size, "next_id": store.next_id}
+            f.write(b"".join(key.ljust(key_size, b"\0") + _POINTER.pack(offset, length)
+                             for key, offset, length in entries))
+        directory = json.dumps({"types": types, "canned": canned}).encode()
+        offset = f.tell()
+        f.write(directory)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, offset, len(directory)))
+    os.replace(partial, path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from mock_backend import MockBackend, generate_dataset
+
+    parser = argparse.ArgumentParser(description="Convert a JSON mock fixture to the binary format.")
+    parser.add_argument("source", help="JSON fixture, e.g. mocks/netsuite.json")
+    parser.add_argument("target", help="Binary fixture to write, e.g. mocks/netsuite.nsmock")
+    parser.add_argument("--scale", type=int, default=0,
+                        help="Also generate this many synthetic customers, sales orders and invoices")
+    args = parser.parse_args(argv)
+    backend = MockBackend.open(args.source)
+    backend.load_all()
+    if args.scale:
+        generate_dataset(backend, args.scale)
+    write_fixture(backend, args.target)
+    print(f"Wrote {args.target}: {backend.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,229 @@
-import json
-import logging
-from typing import Dict, Any
+import gc
+from typing import Dict, Any, List, Optional
 import os
 import sys
 
-logger = logging.getLogger("netsuite_client")
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout) 
-handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-logger.addHandler(handler)
+import httpx
+
+from json_codec import RawJSON
+from logger import SAMPLED, get_logger
+from metrics import metrics
+from mock_backend import MockBackend, generate_dataset
+from scheduler import RequestScheduler, ThrottledError, request_priority
+from singleflight import SingleFlight
+
+logger = get_logger("netsuite_client")
+
+SUITEQL_ENDPOINT = "query/v1/suiteql"
+THROTTLED_STATUSES = (429, 503)
+THROTTLED_ERROR_CODE = "CONCURRENCY_LIMIT_EXCEEDED"
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+def _default_base_url() -> Optional[str]:
+    base_url = os.getenv("NETSUITE_BASE_URL")
+    if base_url:
+        return base_url.rstrip("/")
+    account_id = os.getenv("NETSUITE_ACCOUNT_ID")
+    if account_id:
+        return f"https://{account_id.lower().replace('_', '-')}.suitetalk.api.netsuite.com"
+    return None
 
 class NetSuiteClient:
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        *,
+        access_token: Optional[str] = None,
+        http2: Optional[bool] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        timeout: Optional[float] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
         self.is_mock = os.getenv("NETSUITE_MOCK", "true").lower() == "true"
+        self.base_url = base_url or _default_base_url()
+        self.access_token = access_token or os.getenv("NETSUITE_ACCESS_TOKEN")
+        self.http2 = http2 if http2 is not None else os.getenv("NETSUITE_HTTP2", "true").lower() == "true"
+        self.limits = httpx.Limits(
+            max_connections=max_connections or _env_int("NETSUITE_MAX_CONNECTIONS", 10),
+            max_keepalive_connections=max_keepalive_connections or _env_int("NETSUITE_MAX_KEEPALIVE", 10),
+            keepalive_expiry=_env_float("NETSUITE_KEEPALIVE_EXPIRY", 30.0),
+        )
+        self.timeout = httpx.Timeout(timeout or _env_float("NETSUITE_TIMEOUT", 30.0), connect=10.0)
+        self._http: Optional[httpx.AsyncClient] = None
+        self.singleflight = SingleFlight()
+        self.scheduler = scheduler or RequestScheduler.from_env()
+        self.mock: Optional[MockBackend] = None
+        if not self.is_mock:
+            if not self.base_url:
+                raise ValueError("NETSUITE_BASE_URL or NETSUITE_ACCOUNT_ID is required when NETSUITE_MOCK=false")
+            logger.info("Live mode enabled against %s (HTTP/2: %s)", self.base_url, self.http2)
+            return
         try:
-            mock_file = os.path.join(os.path.dirname(__file__), "..", "mocks", "netsuite.json")
-            logger.debug(f"Attempting to load mock data from: {mock_file}")
-            with open(mock_file, "r") as f:
-                self.mocks = json.load(f)
-            logger.info("Loaded mock data successfully")
-            logger.info(f"Available mock keys: {list(self.mocks.keys())}")
+            mock_file = os.getenv("NETSUITE_MOCK_FILE") or os.path.join(os.path.dirname(__file__), "..", "mocks", "netsuite.json")
+            logger.debug("Attempting to load mock data from: %s", mock_file)
+            # Binary fixtures are memory-mapped and decoded lazily; JSON ones are loaded whole.
+            self.mock = MockBackend.open(mock_file)
+            scale = _env_int("NETSUITE_MOCK_SCALE", 0)
+            if scale:
+                generate_dataset(self.mock, scale)
+                # Millions of long-lived records would otherwise be rescanned by every full collection.
+                gc.freeze()
+            logger.info("Loaded mock data successfully: %s", self.mock.stats())
         except Exception as e:
-            logger.error(f"Error loading mock data: {str(e)}")
+            logger.error("Error loading mock data: %s", e)
             print(f"NetSuiteClient init failed: {str(e)}", file=sys.stderr)
             raise
 
-    async def get(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def start(self) -> None:
+        """Open the shared connection pool. Safe to call more than once."""
+        if self.is_mock or self._http is not None:
+            return
+        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        if self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            http2=self.http2,
+            limits=self.limits,
+            timeout=self.timeout,
+        )
+        logger.info("Opened NetSuite connection pool (max connections: %s)", self.limits.max_connections)
+
+    async def close(self) -> None:
+        if self._http is None:
+            return
+        await self._http.aclose()
+        self._http = None
+        logger.info("Closed NetSuite connection pool")
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        is_read = method == "GET" or endpoint.removeprefix("/services/rest/") == SUITEQL_ENDPOINT
+        send = lambda: self.scheduler.run(
+            lambda: self._send(method, endpoint, data, params, timeout),
+            idempotent=is_read,
+            priority=priority if priority is not None else request_priority.get(),
+        )
+        if is_read:
+            # Reads are idempotent, so identical concurrent reads share one upstream call.
+            return await self.singleflight.do(SingleFlight.key(method, endpoint, data, params), send)
+        return await send()
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]],
+        timeout: Optional[float],
+    ) -> Dict[str, Any]:
+        if self._http is None:
+            await self.start()
+        headers = {}
+        if endpoint.removeprefix("/services/rest/") == SUITEQL_ENDPOINT and data is not None:
+            # The SuiteQL resource takes paging as query parameters, not in the body.
+            params = {**(params or {}), **{k: data[k] for k in ("limit", "offset") if k in data}}
+            data = {"q": data["q"]}
+            headers["Prefer"] = "transient"
+        response = await self._http.request(
+            method,
+            endpoint,
+            json=data,
+            params=params,
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        if response.status_code in THROTTLED_STATUSES or (
+                response.status_code >= 400 and THROTTLED_ERROR_CODE in _error_codes(response)):
+            raise ThrottledError(_error_message(response), _retry_after(response))
+        if 400 <= response.status_code < 500:
+            raise ValueError(_error_message(response))
+        response.raise_for_status()
+        if response.status_code == 204 or not response.content:
+            # NetSuite answers record writes with 204 and the record URL in Location.
+            location = response.headers.get("Location", "")
+            status = "created" if method == "POST" else "updated"
+            return {"id": location.rstrip("/").split("/")[-1] or None, "status": status}
+        # Decoded only if a caller reads it; otherwise the bytes are forwarded as they are.
+        return RawJSON(response.content)
+
+    async def get(self, endpoint: str, params: Dict[str, Any] = None, timeout: Optional[float] = None,
+                  priority: Optional[int] = None) -> Dict[str, Any]:
         endpoint_key = endpoint.removeprefix("/services/rest/")
-        logger.info(f"GET request for endpoint: {endpoint}, key: {endpoint_key}")
-        if endpoint_key in self.mocks:
-            logger.info(f"Found mock data for {endpoint_key}")
-            return self.mocks[endpoint_key]
-        logger.error(f"Mock data not found for {endpoint_key}")
-        raise ValueError(f"Mock data not found for endpoint: {endpoint}")
-
-    async def post(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("GET request for endpoint: %s, key: %s", endpoint, endpoint_key, extra=SAMPLED)
+        with metrics.upstream("GET"):
+            if not self.is_mock:
+                return await self._request("GET", endpoint, params=params, timeout=timeout, priority=priority)
+            data = self.mock.get(endpoint_key)
+            if data is not None:
+                logger.debug("Found mock data for %s", endpoint_key)
+                return data
+            logger.error("Mock data not found for %s", endpoint_key)
+            raise ValueError(f"Mock data not found for endpoint: {endpoint}")
+
+    async def post(self, endpoint: str, data: Dict[str, Any], timeout: Optional[float] = None,
+                   priority: Optional[int] = None) -> Dict[str, Any]:
         endpoint_key = endpoint.removeprefix("/services/rest/")
-        logger.info(f"POST request for endpoint: {endpoint}, key: {endpoint_key}")
-        if endpoint_key in self.mocks:
-            logger.info(f"Found mock data for {endpoint_key}")
-            return self.mocks[endpoint_key]
-        logger.info(f"No mock data for {endpoint_key}, returning default response")
-        return {"id": f"mock_{endpoint_key.split('/')[-1]}", "status": "created"}
-
-    async def patch(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("POST request for endpoint: %s, key: %s", endpoint, endpoint_key, extra=SAMPLED)
+        with metrics.upstream("POST"):
+            if not self.is_mock:
+                return await self._request("POST", endpoint, data=data, timeout=timeout, priority=priority)
+            result = self.mock.post(endpoint_key, data)
+            if result is not None:
+                logger.debug("Found mock data for %s", endpoint_key)
+                return result
+            logger.info("No mock data for %s, returning default response", endpoint_key)
+            return {"id": f"mock_{endpoint_key.split('/')[-1]}", "status": "created"}
+
+    async def patch(self, endpoint: str, data: Dict[str, Any], timeout: Optional[float] = None,
+                    priority: Optional[int] = None) -> Dict[str, Any]:
         endpoint_key = endpoint.removeprefix("/services/rest/")
-        logger.info(f"PATCH request for endpoint: {endpoint}, key: {endpoint_key}")
-        if endpoint_key in self.mocks:
-            logger.info(f"Found mock data for {endpoint_key}")
-            return self.mocks[endpoint_key]
-        logger.info(f"No mock data for {endpoint_key}, returning default response")
-        return {"id": f"mock_{endpoint_key.split('/')[-1]}", "status": "updated"}
\ No newline at end of file
+        logger.info("PATCH request for endpoint: %s, key: %s", endpoint, endpoint_key, extra=SAMPLED)
+        with metrics.upstream("PATCH"):
+            if not self.is_mock:
+                return await self._request("PATCH", endpoint, data=data, timeout=timeout, priority=priority)
+            result = self.mock.patch(endpoint_key, data)
+            if result is not None:
+                logger.debug("Found mock data for %s", endpoint_key)
+                return result
+            logger.info("No mock data for %s, returning default response", endpoint_key)
+            return {"id": f"mock_{endpoint_key.split('/')[-1]}", "status": "updated"}
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        body = response.json()
+        details = body.get("o:errorDetails") or []
+        if details:
+            return details[0].get("detail", body.get("title", ""))
+        return body.get("title") or response.text
+    except ValueError:
+        return f"NetSuite returned HTTP {response.status_code}: {response.text}"
+
+def _error_codes(response: httpx.Response) -> List[str]:
+    try:
+        details = response.json().get("o:errorDetails") or []
+    except (ValueError, AttributeError):
+        return []
+    return [detail.get("o:errorCode") for detail in details if isinstance(detail, dict)]
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,14 @@
+"""NetSuite record type facts shared by the server and the mock backend."""
+
+# SuiteQL exposes these record types through the ``transaction`` table, told apart by ``type``.
+TRANSACTION_TYPE_CODES = {
+    "salesorder": "SalesOrd",
+    "invoice": "CustInvc",
+    "vendorbill": "VendBill",
+    "cashsale": "CashSale",
+    "creditmemo": "CustCred",
+    "purchaseorder": "PurchOrd",
+}
+
+# Lower-cased record types whose changes also affect the transaction tables.
+TRANSACTION_TYPES = frozenset(TRANSACTION_TYPE_CODES)
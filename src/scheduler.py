@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from logger import logger
+
+# Lower values are scheduled first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_BULK = 10
+
+# Priority applied to requests that do not pass one explicitly; set per tool call.
+request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=PRIORITY_DEFAULT)
+
+
+class ThrottledError(Exception):
+    """NetSuite rejected a request with 429 / CONCURRENCY_LIMIT_EXCEEDED."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to throttling (AIMD).
+
+    Each throttled response halves the rate, down to ``min_rate``. Each success
+    adds back a small fraction of ``max_rate``.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float = 0.5):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def throttled(self) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class PrioritySemaphore:
+    """A semaphore that hands free slots to the waiter with the lowest priority value."""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = PRIORITY_DEFAULT) -> None:
+        if self._value > 0 and not self.queued:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on.
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+class RequestScheduler:
+    """Admission control for NetSuite requests.
+
+    Requests wait for a concurrency slot (by priority), then for a rate token.
+    Throttled idempotent requests are retried with full-jitter exponential
+    backoff, or after ``Retry-After`` when NetSuite sends one; either way a
+    retry waits at most ``max_delay`` seconds.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 5,
+        rate: float = 100.0,
+        burst: Optional[float] = None,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.semaphore = PrioritySemaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst if burst is not None else max(1.0, rate))
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls) -> "RequestScheduler":
+        return cls(
+            concurrency=int(os.getenv("NETSUITE_CONCURRENCY_LIMIT", "5")),
+            rate=float(os.getenv("NETSUITE_RATE_LIMIT", "100")),
+            max_retries=int(os.getenv("NETSUITE_MAX_RETRIES", "4")),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(
+        self,
+        send: Callable[[], Awaitable[Any]],
+        idempotent: bool = True,
+        priority: int = PRIORITY_DEFAULT,
+    ) -> Any:
+        attempt = 0
+        while True:
+            await self.semaphore.acquire(priority)
+            self.in_flight += 1
+            try:
+                await self.bucket.acquire()
+                self.requests += 1
+                result = await send()
+                self.bucket.succeeded()
+                return result
+            except ThrottledError as e:
+                self.throttled += 1
+                self.bucket.throttled()
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = min(e.retry_after, self.max_delay) if e.retry_after is not None else self.backoff(attempt)
+            finally:
+                self.in_flight -= 1
+                self.semaphore.release()
+            attempt += 1
+            self.retries += 1
+            logger.info("NetSuite throttled the request, retry %s in %.2fs", attempt, delay)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "in_flight": self.in_flight,
+            "queued": self.semaphore.queued,
+            "rate": round(self.bucket.rate, 3),
+        }
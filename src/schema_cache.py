@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from logger import logger
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "mcp-netsuite")
+FILE_PREFIX = "tool-schemas-"
+
+
+def code_version(paths: Iterable[str], *extra: Any) -> str:
+    """Digest of the given source files and values, e.g. library versions."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    for value in extra:
+        digest.update(str(value).encode())
+    return digest.hexdigest()[:16]
+
+
+class SchemaCache:
+    """Tool JSON schemas kept on disk between processes.
+
+    Generating schemas from the pydantic models is most of the server's own
+    startup time, and stdio clients pay it on every spawn. The file name
+    carries the code version, so a changed model is never served a stale
+    schema; files of other versions are ignored, and deleted on ``save()``.
+    """
+
+    def __init__(self, directory: Optional[str], version: str):
+        self.path = os.path.join(directory, f"{FILE_PREFIX}{version}.json") if directory else None
+        self.schemas: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as f:
+                self.schemas = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable tool schema cache %s: %s", self.path, e)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.schemas.get(key)
+
+    def put(self, key: str, schema: Dict[str, Any]) -> None:
+        if self.schemas.get(key) != schema:
+            self.schemas[key] = schema
+            self.dirty = True
+
+    def save(self) -> None:
+        """Write new schemas, if any, and delete files of other code versions.
+
+        A read-only cache directory only costs the speedup.
+        """
+        if not self.dirty or self.path is None:
+            return
+        partial = f"{self.path}.{os.getpid()}.partial"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(partial, "w") as f:
+                json.dump(self.schemas, f, separators=(",", ":"))
+            os.replace(partial, self.path)
+            self.dirty = False
+            logger.info("Saved %s tool schemas to %s", len(self.schemas), self.path)
+        except OSError as e:
+            logger.warning("Could not write tool schema cache %s: %s", self.path, e)
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        directory, current = os.path.split(self.path)
+        for name in os.listdir(directory):
+            if name.startswith(FILE_PREFIX) and name.endswith(".json") and name != current:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError as e:
+                    logger.warning("Could not delete old tool schema cache %s: %s", name, e)
@@ -1,14 +1,29 @@
-from mcp.server.fastmcp import FastMCP
-from mcp.types import Tool, TextContent
+from mcp.server.fastmcp import FastMCP, Context
+from mcp.server.fastmcp.exceptions import ToolError
+from mcp.server.fastmcp.tools import Tool as RegisteredTool
+from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 from netsuite_client import NetSuiteClient
-from logger import logger
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
+from cache import MetadataCache, RecordCache, QueryResultCache, parse_table_ttls
+from scheduler import PRIORITY_BULK, PRIORITY_DEFAULT, PRIORITY_INTERACTIVE, request_priority
+from suiteql import SUITEQL_PATH, iter_suiteql_pages, fetch_suiteql_parallel, parse_query
+from metrics import ToolCall, current_call, metrics, serve_prometheus
+from record_types import TRANSACTION_TYPE_CODES, TRANSACTION_TYPES
+from json_codec import RawJSON, dumps
+from logger import SAMPLED, logger
+from schema_cache import DEFAULT_DIRECTORY, SchemaCache, code_version
+from typing import Annotated, Callable, Dict, Any, FrozenSet, List, Mapping, Optional, AsyncIterator, Tuple
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, ConfigDict, Field
+import asyncio
+import functools
+import importlib.metadata
 import json
-import sqlparse
 import sys
+import time
 import traceback
 import os
+import pydantic
+import re
 
 # Define custom McpError and ErrorData
 class ErrorData(BaseModel):
@@ -21,307 +36,653 @@ class McpError(Exception):
         self.error_data = error_data
         super().__init__(error_data.message)
 
-mcp = FastMCP("NetSuite")
 ns_client = NetSuiteClient()
+metadata_cache = MetadataCache(
+    lambda: ns_client.get("/services/rest/record/v1/metadata-catalog"),
+    ttl=float(os.getenv("NETSUITE_METADATA_TTL", "300")),
+)
+record_cache = RecordCache(
+    ttl=float(os.getenv("NETSUITE_RECORD_CACHE_TTL", "60")),
+    max_bytes=int(os.getenv("NETSUITE_RECORD_CACHE_MB", "64")) * 1024 * 1024,
+)
+query_cache = QueryResultCache(
+    default_ttl=float(os.getenv("NETSUITE_SUITEQL_CACHE_TTL", "30")),
+    table_ttls=parse_table_ttls(os.getenv("NETSUITE_SUITEQL_TABLE_TTLS", "")),
+    max_bytes=int(os.getenv("NETSUITE_SUITEQL_CACHE_MB", "32")) * 1024 * 1024,
+)
+# Scheduling priority of each tool's NetSuite requests (lower runs first), so
+# interactive lookups are not stuck behind bulk SuiteQL and batch traffic.
+TOOL_PRIORITIES = {
+    "fetch_customer": PRIORITY_INTERACTIVE,
+    "fetch_sales_order": PRIORITY_INTERACTIVE,
+    "fetch_invoice": PRIORITY_INTERACTIVE,
+    "fetch_record": PRIORITY_INTERACTIVE,
+    "fetch_metadata": PRIORITY_INTERACTIVE,
+    "execute_suiteql": PRIORITY_BULK,
+    "fetch_records_batch": PRIORITY_BULK,
+    "create_records_batch": PRIORITY_BULK,
+    "update_records_batch": PRIORITY_BULK,
+    "sync_records": PRIORITY_BULK,
+}
+for entry in filter(None, os.getenv("NETSUITE_TOOL_PRIORITIES", "").split(",")):
+    tool_name, _, tool_priority = entry.partition("=")
+    TOOL_PRIORITIES[tool_name.strip()] = int(tool_priority)
+
+def instrumented(fn):
+    """Run a tool with its request priority, latency metrics, logging and error mapping."""
+    name = fn.__name__
+    priority = TOOL_PRIORITIES.get(name, PRIORITY_DEFAULT)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        entered = time.perf_counter()
+        call = current_call.get()
+        call_token = None
+        if call is None:
+            # Called directly rather than through MCP; time the handler on its own.
+            call = ToolCall(entered)
+            call_token = current_call.set(call)
+        call.entered = entered
+        priority_token = request_priority.set(priority)
+        metrics.add_gauge("mcp_tool_in_flight", 1, tool=name)
+        logger.info("Calling %s", name, extra=SAMPLED)
+        status = "error"
+        try:
+            result = await fn(*args, **kwargs)
+            status = "ok"
+            return result
+        except McpError as e:
+            logger.error("Error in %s: %s", name, e.error_data.message)
+            raise
+        except ValueError as e:
+            logger.error("Error in %s: %s", name, e)
+            raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
+        except Exception as e:
+            logger.error("Error in %s: %s", name, e)
+            raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+        finally:
+            elapsed = time.perf_counter() - entered
+            request_priority.reset(priority_token)
+            if call_token is not None:
+                current_call.reset(call_token)
+            metrics.add_gauge("mcp_tool_in_flight", -1, tool=name)
+            metrics.inc("mcp_tool_calls_total", tool=name, status=status)
+            # Upstream time is summed over the call's NetSuite requests, which may overlap.
+            metrics.observe("mcp_tool_seconds", call.upstream, tool=name, phase="upstream")
+            metrics.observe("mcp_tool_seconds", max(0.0, elapsed - call.upstream), tool=name, phase="handler")
+            logger.info("%s %s in %.1f ms (Mock: %s)", name, status, elapsed * 1000, ns_client.is_mock,
+                        extra=SAMPLED)
+    return wrapper
+
+# Open users of the pooled client. In HTTP mode every MCP session enters the
+# FastMCP lifespan, so the client is shared and closed only by its last user.
+_resource_users = 0
+_resource_lock = asyncio.Lock()
+_metrics_server = None
+
+@asynccontextmanager
+async def shared_resources() -> AsyncIterator[None]:
+    global _resource_users, _metrics_server
+    async with _resource_lock:
+        _resource_users += 1
+        if _resource_users == 1:
+            # One pooled client per server process, so tool calls reuse warm connections.
+            await ns_client.start()
+            if os.getenv("NETSUITE_METRICS_PORT"):
+                _metrics_server = await serve_prometheus(int(os.getenv("NETSUITE_METRICS_PORT")),
+                                                         os.getenv("NETSUITE_METRICS_HOST", "127.0.0.1"))
+    try:
+        yield
+    finally:
+        async with _resource_lock:
+            _resource_users -= 1
+            if _resource_users == 0:
+                if _metrics_server is not None:
+                    _metrics_server.close()
+                    _metrics_server = None
+                await ns_client.close()
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    async with shared_resources():
+        yield {"ns_client": ns_client}
+
+# Tool schemas are generated once per code version and reused by later processes.
+schema_cache = SchemaCache(
+    os.getenv("NETSUITE_SCHEMA_CACHE", DEFAULT_DIRECTORY) or None,
+    code_version([__file__], importlib.metadata.version("mcp"), pydantic.VERSION),
+)
+
+def to_content(result: Any) -> List[Any]:
+    """Encode a tool result in one pass with the fast codec; undecoded upstream JSON is passed through."""
+    if isinstance(result, (TextContent, ImageContent, EmbeddedResource)):
+        return [result]
+    return [TextContent(type="text", text=result if isinstance(result, str) else dumps(result).decode())]
+
+class InstrumentedFastMCP(FastMCP):
+    """FastMCP that keeps its own tool registry, to time argument validation and result serialization.
+
+    Tools whose schema is in the schema cache are listed from it, and their
+    argument model is only built on their first call.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.tool_functions: Dict[str, Tuple[Callable[..., Any], str]] = {}
+        self.tool_schemas: Dict[str, Tool] = {}
+        self.built_tools: Dict[str, RegisteredTool] = {}
+
+    def add_tool(self, fn, name: Optional[str] = None, description: Optional[str] = None) -> None:
+        name = name or fn.__name__
+        description = description or fn.__doc__ or ""
+        self.tool_functions[name] = (fn, description)
+        parameters = schema_cache.get(f"tool:{name}")
+        if parameters is None:
+            parameters = self.get_tool(name).parameters
+            schema_cache.put(f"tool:{name}", parameters)
+        self.tool_schemas[name] = Tool(name=name, description=description, inputSchema=parameters)
+
+    def get_tool(self, name: str) -> RegisteredTool:
+        tool = self.built_tools.get(name)
+        if tool is None:
+            if name not in self.tool_functions:
+                raise ToolError(f"Unknown tool: {name}")
+            fn, description = self.tool_functions[name]
+            tool = self.built_tools[name] = RegisteredTool.from_function(fn, name=name, description=description)
+        return tool
+
+    async def list_tools(self) -> List[Tool]:
+        return list(self.tool_schemas.values())
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        call = ToolCall(time.perf_counter())
+        token = current_call.set(call)
+        try:
+            result = await self.get_tool(name).run(arguments, context=self.get_context())
+        finally:
+            current_call.reset(token)
+            if call.entered is not None:
+                metrics.observe("mcp_tool_seconds", call.entered - call.started, tool=name, phase="validation")
+        serialize_started = time.perf_counter()
+        content = to_content(result)
+        finished = time.perf_counter()
+        metrics.observe("mcp_tool_seconds", finished - serialize_started, tool=name, phase="serialization")
+        metrics.observe("mcp_tool_seconds", finished - call.started, tool=name, phase="total")
+        return content
+
+mcp = InstrumentedFastMCP("NetSuite", lifespan=lifespan)
+
+class ToolInput(BaseModel):
+    # Validators are built on first use instead of at import.
+    model_config = ConfigDict(defer_build=True)
 
 # Input Models for Dedicated Tools
-class CustomerInput(BaseModel):
+class CustomerInput(ToolInput):
     customer_id: str = Field(..., pattern=r"^\d+$", description="Numeric customer ID")
 
-class CreateCustomerInput(BaseModel):
+class CreateCustomerInput(ToolInput):
     company_name: str = Field(..., min_length=1, description="Company name")
     email: str = Field(..., description="Email address")
     subsidiary: str = Field(..., description="Subsidiary ID")
 
-class SearchCustomersInput(BaseModel):
+# Paginated calls hold every row they return in memory; larger reads continue from nextOffset.
+MAX_PAGINATED_ROWS = 5000
+
+class SearchCustomersInput(ToolInput):
     query: str = Field(..., min_length=3, description="Search term for company name or email")
     limit: int = Field(default=10, ge=1, le=100, description="Number of results to return")
     offset: int = Field(default=0, ge=0, description="Result offset")
+    paginate: bool = Field(default=False, description="Follow further pages, using limit as the page size")
+    max_rows: int = Field(default=1000, ge=1, le=MAX_PAGINATED_ROWS, description="Maximum rows to return when paginating")
 
-class SalesOrderInput(BaseModel):
+class SalesOrderInput(ToolInput):
     sales_order_id: str = Field(..., pattern=r"^\d+$", description="Numeric sales order ID")
 
-class CreateSalesOrderInput(BaseModel):
+class CreateSalesOrderInput(ToolInput):
     customer_id: str = Field(..., pattern=r"^\d+$", description="Numeric customer ID")
     item_id: str = Field(..., pattern=r"^\d+$", description="Numeric item ID")
     quantity: int = Field(..., ge=1, description="Quantity of items")
 
-class InvoiceInput(BaseModel):
+class InvoiceInput(ToolInput):
     invoice_id: str = Field(..., pattern=r"^\d+$", description="Numeric invoice ID")
 
-class CreateInvoiceInput(BaseModel):
+class CreateInvoiceInput(ToolInput):
     sales_order_id: str = Field(..., pattern=r"^\d+$", description="Numeric sales order ID")
     amount: float = Field(..., gt=0, description="Invoice amount")
 
 # Input Models for Generic Tools
-class RecordInput(BaseModel):
+FieldName = Annotated[str, Field(pattern=r"^[A-Za-z_][\w.]*$")]
+
+class RecordInput(ToolInput):
     record_type: str = Field(..., description="NetSuite record type (e.g., customer, salesOrder)")
     record_id: str = Field(..., pattern=r"^\d+$", description="Numeric record ID")
+    fields: Optional[List[FieldName]] = Field(default=None, min_length=1, description="Only return these fields")
 
-class CreateRecordInput(BaseModel):
+class CreateRecordInput(ToolInput):
     record_type: str = Field(..., description="NetSuite record type (e.g., customer, salesOrder)")
     payload: Dict[str, Any] = Field(..., description="Record data as a JSON object")
 
-class UpdateRecordInput(BaseModel):
+class UpdateRecordInput(ToolInput):
     record_type: str = Field(..., description="NetSuite record type (e.g., customer, salesOrder)")
     record_id: str = Field(..., pattern=r"^\d+$", description="Numeric record ID")
     payload: Dict[str, Any] = Field(..., description="Updated record data as a JSON object")
 
-class ExecuteSuiteQLInput(BaseModel):
+class ExecuteSuiteQLInput(ToolInput):
     query: str = Field(..., description="SuiteQL SELECT query")
     limit: int = Field(default=100, ge=1, le=1000, description="Number of results to return")
     offset: int = Field(default=0, ge=0, description="Result offset")
+    paginate: bool = Field(default=False, description="Follow further pages, using limit as the page size")
+    max_rows: int = Field(default=MAX_PAGINATED_ROWS, ge=1, le=MAX_PAGINATED_ROWS,
+                          description="Maximum rows to return when paginating; continue from nextOffset for more")
+    concurrency: int = Field(default=1, ge=1, le=20, description="Pages fetched in parallel when paginating")
+    fields: Optional[List[FieldName]] = Field(default=None, min_length=1, description="Only return these columns")
+
+# Input Models for Batch Tools
+class BatchFetchInput(ToolInput):
+    records: List[RecordInput] = Field(..., min_length=1, max_length=1000, description="Records to fetch")
+    concurrency: int = Field(default=10, ge=1, le=50, description="Maximum records processed in parallel")
+
+class BatchCreateInput(ToolInput):
+    records: List[CreateRecordInput] = Field(..., min_length=1, max_length=1000, description="Records to create")
+    concurrency: int = Field(default=10, ge=1, le=50, description="Maximum records processed in parallel")
+
+class BatchUpdateInput(ToolInput):
+    records: List[UpdateRecordInput] = Field(..., min_length=1, max_length=1000, description="Records to update")
+    concurrency: int = Field(default=10, ge=1, le=50, description="Maximum records processed in parallel")
+
+class SyncRecordsInput(ToolInput):
+    record_type: str = Field(..., description="NetSuite record type (e.g., customer, invoice)")
+    since: Optional[str] = Field(default=None, pattern=r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$",
+                                 description="Return records modified at or after this UTC time (e.g. 2025-01-01T00:00:00Z) "
+                                             "instead of after the cursor's watermark; the cursor is left as is")
+    cursor: str = Field(default="default", pattern=r"^[\w.-]{1,64}$", description="Watermark name; agents sharing a server should each use their own")
+    page_size: int = Field(default=500, ge=1, le=1000, description="SuiteQL page size")
+    max_rows: int = Field(default=5000, ge=1, le=100000, description="Maximum changed records returned per call")
+    concurrency: int = Field(default=10, ge=1, le=50, description="Changed records refreshed in parallel")
+
+async def validate_record_type(record_type: str) -> None:
+    metadata = await metadata_cache.get()
+    if record_type not in metadata.record_types:
+        raise McpError(ErrorData(code="INVALID_PARAMS", message=f"Invalid record type: {record_type}"))
+
+async def fetch_cached(record_type: str, record_id: str) -> Dict[str, Any]:
+    return await record_cache.get_or_fetch(
+        record_type,
+        record_id,
+        lambda: ns_client.get(f"/services/rest/record/v1/{record_type}/{record_id}"),
+    )
+
+def project_rows(rows: List[Mapping[str, Any]], fields: List[str]) -> List[Dict[str, Any]]:
+    """Only the requested fields of each row. NetSuite returns SuiteQL columns in lower case, so names match either way."""
+    # Rows may omit empty columns, so names are resolved once per distinct set of keys.
+    layouts: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+    projected = []
+    for row in rows:
+        keys = tuple(row)
+        columns = layouts.get(keys)
+        if columns is None:
+            names = {name.lower(): name for name in keys}
+            columns = layouts[keys] = [(field, field if field in row else names.get(field.lower(), field))
+                                       for field in fields]
+        projected.append({field: row.get(name) for field, name in columns})
+    return projected
+
+_SELECT_ALL = re.compile(r"^\s*SELECT\s+\*\s+FROM\s", re.IGNORECASE)
+
+def select_fields(query: str, fields: List[str]) -> str:
+    """Narrow ``SELECT *`` to the requested columns, so NetSuite only sends those."""
+    match = _SELECT_ALL.match(query)
+    if match is None:
+        return query
+    return f"SELECT {', '.join(fields)} FROM {query[match.end():]}"
+
+async def fetch_fields(item: RecordInput) -> Mapping[str, Any]:
+    if not item.fields:
+        return await fetch_cached(item.record_type, item.record_id)
+    record = record_cache.get(item.record_type, item.record_id)
+    if record is None:
+        # NetSuite sends only the requested fields; partial records are not cached.
+        record = await ns_client.get(f"/services/rest/record/v1/{item.record_type}/{item.record_id}",
+                                     params={"fields": ",".join(item.fields)})
+    return project_rows([record], item.fields)[0]
+
+async def run_suiteql(query: str, limit: int, offset: int, paginate: bool, max_rows: int,
+                      ctx: Optional[Context] = None, concurrency: int = 1,
+                      fields: Optional[List[str]] = None) -> Mapping[str, Any]:
+    if fields:
+        query = select_fields(query, fields)
+    if not paginate:
+        parsed = parse_query(query)
+        key = (parsed.normalized, limit, offset)
+        result = query_cache.get(key)
+        if result is None:
+            # The page is kept as NetSuite sent it, so without a projection it is forwarded undecoded.
+            result = await ns_client.post(SUITEQL_PATH, {"q": query, "limit": limit, "offset": offset})
+            query_cache.put(key, parsed.tables, result)
+    elif concurrency > 1:
+        on_page = ctx.report_progress if ctx is not None else None
+        result = await fetch_suiteql_parallel(ns_client, query, limit, offset, max_rows, concurrency, on_page)
+    else:
+        # Paginated mode holds at most max_rows rows and reports progress per page;
+        # callers continue from nextOffset to read the rest in chunks.
+        items: List[Dict[str, Any]] = []
+        total = 0
+        following = None
+        async for page in iter_suiteql_pages(ns_client, query, limit, offset, max_rows):
+            items.extend(page["items"])
+            total = page.get("totalResults", total)
+            following = page["nextOffset"]
+            if ctx is not None:
+                await ctx.report_progress(len(items), min(total - offset, max_rows) if total else None)
+        result = {"items": items, "totalResults": total, "hasMore": following is not None, "nextOffset": following}
+    if fields:
+        result = {**result, "items": project_rows(result.get("items", []), fields)}
+    return result
+
+def invalidate_record(record_type: str, record_id: Optional[str]) -> None:
+    record_cache.invalidate(record_type, record_id)
+    query_cache.invalidate_table(record_type)
+    if record_type.lower() in TRANSACTION_TYPES:
+        query_cache.invalidate_table("transaction")
+        query_cache.invalidate_table("transactionline")
+
+async def run_batch(items: List[BaseModel], concurrency: int, operation) -> Dict[str, Any]:
+    # Each item succeeds or fails on its own; errors are reported per item.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, item: BaseModel) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"index": index, "ok": True, "data": await operation(item)}
+            except McpError as e:
+                error = {"code": e.error_data.code, "message": e.error_data.message}
+            except ValueError as e:
+                error = {"code": "INVALID_PARAMS", "message": str(e)}
+            except Exception as e:
+                error = {"code": "INTERNAL_ERROR", "message": str(e)}
+            logger.error("Batch item %s failed: %s", index, error['message'])
+            return {"index": index, "ok": False, "error": error}
+
+    results = await asyncio.gather(*(run(index, item) for index, item in enumerate(items)))
+    succeeded = sum(1 for result in results if result["ok"])
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+# Newest lastModifiedDate synced per (record type, cursor), with the ids already
+# delivered at that date; per server process.
+SyncWatermark = Tuple[Optional[str], FrozenSet[str]]
+sync_watermarks: Dict[Tuple[str, str], SyncWatermark] = {}
+SYNC_DATE_FORMAT = 'YYYY-MM-DD"T"HH24:MI:SS"Z"'
+# NetSuite returns SuiteQL columns in lower case, so the date is aliased in lower case too.
+SYNC_DATE_COLUMN = "lastmodifieddate"
+
+def sync_query(record_type: str, since: Optional[str]) -> str:
+    """SuiteQL listing ids of records modified at or after ``since``, oldest change first."""
+    type_code = TRANSACTION_TYPE_CODES.get(record_type.lower())
+    conditions = [f"type = '{type_code}'"] if type_code else []
+    if since:
+        # Dates only have second precision, and a change can commit after others stamped
+        # with the same second were synced, so that second is read again.
+        conditions.append(f"lastModifiedDate >= TO_TIMESTAMP('{since}', '{SYNC_DATE_FORMAT}')")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Dates are formatted explicitly, so they compare as text whatever the account's date preferences.
+    return (f"SELECT id, TO_CHAR(lastModifiedDate, '{SYNC_DATE_FORMAT}') AS {SYNC_DATE_COLUMN} "
+            f"FROM {'transaction' if type_code else record_type}{where} ORDER BY lastModifiedDate, id")
+
+def next_watermark(rows: List[Dict[str, Any]], failed: List[int], previous: SyncWatermark) -> SyncWatermark:
+    """Newest date reached and the ids delivered at it.
+
+    ``rows`` are the undelivered changes ordered by date. Rows before the first
+    failed one have been delivered; the failed row and the rest are read again
+    next time. Rows sharing the new date are skipped then by their id.
+    """
+    delivered = [row for row in (rows[:min(failed)] if failed else rows) if row.get(SYNC_DATE_COLUMN)]
+    if not delivered:
+        return previous
+    date = delivered[-1][SYNC_DATE_COLUMN]
+    seen = previous[1] if date == previous[0] else frozenset()
+    return date, seen | {str(row["id"]) for row in delivered if row[SYNC_DATE_COLUMN] == date}
 
 # Tool Implementations
 @mcp.tool()
+@instrumented
 async def fetch_customer(input: CustomerInput) -> Dict[str, Any]:
-    logger.info(f"Calling fetch_customer with input: {input.model_dump()}")
-    try:
-        data = await ns_client.get(f"/services/rest/record/v1/customer/{input.customer_id}")
-        logger.info(f"Fetched customer {input.customer_id} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error fetching customer {input.customer_id}: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error fetching customer {input.customer_id}: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    return await fetch_cached("customer", input.customer_id)
 
 @mcp.tool()
+@instrumented
 async def create_customer(input: CreateCustomerInput) -> Dict[str, Any]:
-    logger.info(f"Calling create_customer with input: {input.model_dump()}")
-    try:
-        payload = {
-            "companyName": input.company_name,
-            "email": input.email,
-            "subsidiary": {"id": input.subsidiary}
-        }
-        data = await ns_client.post("/services/rest/record/v1/customer", payload)
-        logger.info(f"Created customer {input.company_name} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error creating customer: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error creating customer: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    payload = {
+        "companyName": input.company_name,
+        "email": input.email,
+        "subsidiary": {"id": input.subsidiary}
+    }
+    data = await ns_client.post("/services/rest/record/v1/customer", payload)
+    invalidate_record("customer", data.get("id"))
+    return data
 
 @mcp.tool()
-async def search_customers(input: SearchCustomersInput) -> Dict[str, Any]:
-    logger.info(f"Calling search_customers with input: {input.model_dump()}")
-    try:
-        suiteql = {
-            "q": f"SELECT id, companyName, email FROM customer WHERE companyName LIKE '%{input.query}%' OR email LIKE '%{input.query}%'",
-            "limit": input.limit,
-            "offset": input.offset
-        }
-        data = await ns_client.post("/services/rest/query/v1/suiteql", suiteql)
-        logger.info(f"Searched customers with query: {input.query} (Mock: {ns_client.is_mock})")
-        return {"items": data.get("items", []), "totalResults": data.get("totalResults", 0)}
-    except ValueError as e:
-        logger.error(f"Error searching customers: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error searching customers: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+@instrumented
+async def search_customers(input: SearchCustomersInput, ctx: Context = None) -> Dict[str, Any]:
+    query = f"SELECT id, companyName, email FROM customer WHERE companyName LIKE '%{input.query}%' OR email LIKE '%{input.query}%'"
+    return await run_suiteql(query, input.limit, input.offset, input.paginate, input.max_rows, ctx)
 
 @mcp.tool()
+@instrumented
 async def fetch_sales_order(input: SalesOrderInput) -> Dict[str, Any]:
-    logger.info(f"Calling fetch_sales_order with input: {input.model_dump()}")
-    try:
-        data = await ns_client.get(f"/services/rest/record/v1/salesOrder/{input.sales_order_id}")
-        logger.info(f"Fetched sales order {input.sales_order_id} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error fetching sales order {input.sales_order_id}: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error fetching sales order {input.sales_order_id}: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    return await fetch_cached("salesOrder", input.sales_order_id)
 
 @mcp.tool()
+@instrumented
 async def create_sales_order(input: CreateSalesOrderInput) -> Dict[str, Any]:
-    logger.info(f"Calling create_sales_order with input: {input.model_dump()}")
-    try:
-        payload = {
-            "entity": {"id": input.customer_id},
-            "item": {"items": [{"item": {"id": input.item_id}, "quantity": input.quantity}]}
-        }
-        data = await ns_client.post("/services/rest/record/v1/salesOrder", payload)
-        logger.info(f"Created sales order for customer {input.customer_id} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error creating sales order: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error creating sales order: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    payload = {
+        "entity": {"id": input.customer_id},
+        "item": {"items": [{"item": {"id": input.item_id}, "quantity": input.quantity}]}
+    }
+    data = await ns_client.post("/services/rest/record/v1/salesOrder", payload)
+    invalidate_record("salesOrder", data.get("id"))
+    return data
 
 @mcp.tool()
+@instrumented
 async def fetch_invoice(input: InvoiceInput) -> Dict[str, Any]:
-    logger.info(f"Calling fetch_invoice with input: {input.model_dump()}")
-    try:
-        data = await ns_client.get(f"/services/rest/record/v1/invoice/{input.invoice_id}")
-        logger.info(f"Fetched invoice {input.invoice_id} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error fetching invoice {input.invoice_id}: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error fetching invoice {input.invoice_id}: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    return await fetch_cached("invoice", input.invoice_id)
 
 @mcp.tool()
+@instrumented
 async def create_invoice(input: CreateInvoiceInput) -> Dict[str, Any]:
-    logger.info(f"Calling create_invoice with input: {input.model_dump()}")
-    try:
-        payload = {
-            "createdFrom": {"id": input.sales_order_id},
-            "total": input.amount
-        }
-        data = await ns_client.post("/services/rest/record/v1/invoice", payload)
-        logger.info(f"Created invoice from sales order {input.sales_order_id} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error creating invoice: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error creating invoice: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    payload = {
+        "createdFrom": {"id": input.sales_order_id},
+        "total": input.amount
+    }
+    data = await ns_client.post("/services/rest/record/v1/invoice", payload)
+    invalidate_record("invoice", data.get("id"))
+    return data
 
 @mcp.tool()
+@instrumented
 async def fetch_record(input: RecordInput) -> Dict[str, Any]:
-    logger.info(f"Calling fetch_record with input: {input.model_dump()}")
-    try:
-        metadata = await fetch_metadata()
-        valid_types = [record["type"] for record in metadata.get("records", [])]
-        if input.record_type not in valid_types:
-            raise McpError(ErrorData(code="INVALID_PARAMS", message=f"Invalid record type: {input.record_type}"))
-        data = await ns_client.get(f"/services/rest/record/v1/{input.record_type}/{input.record_id}")
-        logger.info(f"Fetched {input.record_type} {input.record_id} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error fetching {input.record_type} {input.record_id}: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error fetching {input.record_type} {input.record_id}: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    await validate_record_type(input.record_type)
+    return await fetch_fields(input)
 
 @mcp.tool()
+@instrumented
 async def create_record(input: CreateRecordInput) -> Dict[str, Any]:
-    logger.info(f"Calling create_record with input: {input.model_dump()}")
-    try:
-        metadata = await fetch_metadata()
-        valid_types = [record["type"] for record in metadata.get("records", [])]
-        if input.record_type not in valid_types:
-            raise McpError(ErrorData(code="INVALID_PARAMS", message=f"Invalid record type: {input.record_type}"))
-        data = await ns_client.post(f"/services/rest/record/v1/{input.record_type}", input.payload)
-        logger.info(f"Created {input.record_type} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error creating {input.record_type}: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error creating {input.record_type}: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    await validate_record_type(input.record_type)
+    data = await ns_client.post(f"/services/rest/record/v1/{input.record_type}", input.payload)
+    invalidate_record(input.record_type, data.get("id"))
+    return data
 
 @mcp.tool()
+@instrumented
 async def update_record(input: UpdateRecordInput) -> Dict[str, Any]:
-    logger.info(f"Calling update_record with input: {input.model_dump()}")
-    try:
-        metadata = await fetch_metadata()
-        valid_types = [record["type"] for record in metadata.get("records", [])]
-        if input.record_type not in valid_types:
-            raise McpError(ErrorData(code="INVALID_PARAMS", message=f"Invalid record type: {input.record_type}"))
-        data = await ns_client.patch(f"/services/rest/record/v1/{input.record_type}/{input.record_id}", input.payload)
-        logger.info(f"Updated {input.record_type} {input.record_id} (Mock: {ns_client.is_mock})")
-        return data
-    except ValueError as e:
-        logger.error(f"Error updating {input.record_type} {input.record_id}: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error updating {input.record_type} {input.record_id}: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+    await validate_record_type(input.record_type)
+    data = await ns_client.patch(f"/services/rest/record/v1/{input.record_type}/{input.record_id}", input.payload)
+    invalidate_record(input.record_type, input.record_id)
+    return data
 
 @mcp.tool()
-async def execute_suiteql(input: ExecuteSuiteQLInput) -> Dict[str, Any]:
-    logger.info(f"Calling execute_suiteql with input: {input.model_dump()}")
-    try:
-        if not input.query.strip():
-            raise McpError(ErrorData(code="INVALID_PARAMS", message="Query cannot be empty"))
-        parsed = sqlparse.parse(input.query)
-        if not parsed or parsed[0].get_type() != "SELECT":
-            raise McpError(ErrorData(code="INVALID_PARAMS", message="Only SELECT queries supported"))
-        suiteql = {"q": input.query, "limit": input.limit, "offset": input.offset}
-        data = await ns_client.post("/services/rest/query/v1/suiteql", suiteql)
-        logger.info(f"Executed SuiteQL: {input.query} (Mock: {ns_client.is_mock})")
-        return {"items": data.get("items", []), "totalResults": data.get("totalResults", 0)}
-    except ValueError as e:
-        logger.error(f"Error executing SuiteQL: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except IndexError as e:
-        logger.error(f"Error parsing SuiteQL query: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message="Invalid query syntax"))
-    except Exception as e:
-        logger.error(f"Error executing SuiteQL: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
+@instrumented
+async def execute_suiteql(input: ExecuteSuiteQLInput, ctx: Context = None) -> Dict[str, Any]:
+    if not input.query.strip():
+        raise McpError(ErrorData(code="INVALID_PARAMS", message="Query cannot be empty"))
+    if parse_query(input.query).statement_type != "SELECT":
+        raise McpError(ErrorData(code="INVALID_PARAMS", message="Only SELECT queries supported"))
+    return await run_suiteql(input.query, input.limit, input.offset, input.paginate, input.max_rows, ctx,
+                             input.concurrency, input.fields)
 
 @mcp.tool()
-async def fetch_metadata() -> Dict[str, Any]:
-    logger.info("Calling fetch_metadata")
-    try:
-        data = await ns_client.get("/services/rest/record/v1/metadata-catalog")
-        logger.info(f"Fetched metadata (Mock: {ns_client.is_mock})")
+@instrumented
+async def fetch_records_batch(input: BatchFetchInput) -> Dict[str, Any]:
+    async def fetch(item: RecordInput) -> Dict[str, Any]:
+        await validate_record_type(item.record_type)
+        return await fetch_fields(item)
+
+    return await run_batch(input.records, input.concurrency, fetch)
+
+@mcp.tool()
+@instrumented
+async def create_records_batch(input: BatchCreateInput) -> Dict[str, Any]:
+    async def create(item: CreateRecordInput) -> Dict[str, Any]:
+        await validate_record_type(item.record_type)
+        data = await ns_client.post(f"/services/rest/record/v1/{item.record_type}", item.payload)
+        invalidate_record(item.record_type, data.get("id"))
         return data
-    except ValueError as e:
-        logger.error(f"Error fetching metadata: {str(e)}")
-        raise McpError(ErrorData(code="INVALID_PARAMS", message=str(e)))
-    except Exception as e:
-        logger.error(f"Error fetching metadata: {str(e)}")
-        raise McpError(ErrorData(code="INTERNAL_ERROR", message=str(e)))
-
-# Tool Definitions
-def list_tools() -> List[Tool]:
-    logger.info("Executing list_tools")
-    tools = [
-        Tool(name="fetch_customer", description="Fetch a customer by ID", inputSchema=CustomerInput.model_json_schema()),
-        Tool(name="create_customer", description="Create a new customer", inputSchema=CreateCustomerInput.model_json_schema()),
-        Tool(name="search_customers", description="Search customers by name or email", inputSchema=SearchCustomersInput.model_json_schema()),
-        Tool(name="fetch_sales_order", description="Fetch a sales order by ID", inputSchema=SalesOrderInput.model_json_schema()),
-        Tool(name="create_sales_order", description="Create a sales order", inputSchema=CreateSalesOrderInput.model_json_schema()),
-        Tool(name="fetch_invoice", description="Fetch an invoice by ID", inputSchema=InvoiceInput.model_json_schema()),
-        Tool(name="create_invoice", description="Create an invoice", inputSchema=CreateInvoiceInput.model_json_schema()),
-        Tool(name="fetch_record", description="Fetch any NetSuite record by type and ID", inputSchema=RecordInput.model_json_schema()),
-        Tool(name="create_record", description="Create any NetSuite record", inputSchema=CreateRecordInput.model_json_schema()),
-        Tool(name="update_record", description="Update any NetSuite record", inputSchema=UpdateRecordInput.model_json_schema()),
-        Tool(name="execute_suiteql", description="Execute a SuiteQL query", inputSchema=ExecuteSuiteQLInput.model_json_schema()),
-        Tool(name="fetch_metadata", description="Fetch NetSuite record metadata", inputSchema={}),
-    ]
-    logger.info(f"Returning {len(tools)} tools")
-    return tools
-
-# Register tools manually
-logger.info("Registering tools")
-mcp.tools = list_tools()
-logger.info("Registration complete")
+
+    return await run_batch(input.records, input.concurrency, create)
+
+@mcp.tool()
+@instrumented
+async def update_records_batch(input: BatchUpdateInput) -> Dict[str, Any]:
+    async def update(item: UpdateRecordInput) -> Dict[str, Any]:
+        await validate_record_type(item.record_type)
+        data = await ns_client.patch(f"/services/rest/record/v1/{item.record_type}/{item.record_id}", item.payload)
+        invalidate_record(item.record_type, item.record_id)
+        return data
+
+    return await run_batch(input.records, input.concurrency, update)
+
+@mcp.tool()
+@instrumented
+async def sync_records(input: SyncRecordsInput) -> Dict[str, Any]:
+    await validate_record_type(input.record_type)
+    key = (input.record_type, input.cursor)
+    since, seen = (input.since, frozenset()) if input.since else sync_watermarks.get(key, (None, frozenset()))
+    rows: List[Dict[str, Any]] = []
+    truncated = False
+    # Rows already delivered at the watermark come first; read past them.
+    async for page in iter_suiteql_pages(ns_client, sync_query(input.record_type, since), input.page_size, 0,
+                                         input.max_rows + len(seen)):
+        rows.extend(row for row in page["items"]
+                    if row.get(SYNC_DATE_COLUMN) != since or str(row["id"]) not in seen)
+        truncated = page["nextOffset"] is not None
+
+    async def refresh(item: RecordInput) -> Dict[str, Any]:
+        # The cached copy is older than the change; replace it and drop affected SuiteQL results.
+        invalidate_record(item.record_type, item.record_id)
+        return await fetch_cached(item.record_type, item.record_id)
+
+    changes: List[Dict[str, Any]] = []
+    failed: List[int] = []
+    errors: List[Dict[str, Any]] = []
+    if rows:
+        items = [RecordInput(record_type=input.record_type, record_id=str(row["id"])) for row in rows]
+        refreshed = await run_batch(items, input.concurrency, refresh)
+        for result in refreshed["results"]:
+            if result["ok"]:
+                changes.append(result["data"])
+            else:
+                failed.append(result["index"])
+                errors.append({"id": items[result["index"]].record_id, **result["error"]})
+    watermark = next_watermark(rows, failed, (since, seen))
+    # An explicit since is a one-off read; it does not move the cursor.
+    if watermark[0] is not None and not input.since:
+        sync_watermarks[key] = watermark
+    return {
+        "recordType": input.record_type,
+        "since": since,
+        "watermark": watermark[0],
+        "changes": changes,
+        "count": len(changes),
+        "errors": errors,
+        "hasMore": truncated or bool(failed),
+    }
+
+@mcp.tool()
+@instrumented
+async def fetch_metadata(refresh: bool = False) -> Dict[str, Any]:
+    if refresh:
+        # After custom record types or fields are added in NetSuite, so validation sees them.
+        metadata_cache.invalidate()
+    return (await metadata_cache.get()).catalog
+
+@mcp.tool()
+async def get_server_stats() -> Dict[str, Any]:
+    return {
+        "mock": ns_client.is_mock,
+        "metrics": metrics.snapshot(),
+        "caches": {
+            "metadata": metadata_cache.stats(),
+            "record": record_cache.stats(),
+            "suiteql": query_cache.stats(),
+        },
+        "coalescing": ns_client.singleflight.stats(),
+        "scheduler": ns_client.scheduler.stats(),
+    }
+
+def cache_samples():
+    caches = {"metadata": metadata_cache.stats(), "record": record_cache.stats(), "suiteql": query_cache.stats()}
+    for cache_name, stats in caches.items():
+        for key in ("hits", "misses", "invalidations"):
+            yield f"netsuite_cache_{key}_total", {"cache": cache_name}, stats[key]
+    yield "netsuite_coalesced_total", {}, ns_client.singleflight.coalesced
+    yield "netsuite_throttled_total", {}, ns_client.scheduler.throttled
+    yield "netsuite_retries_total", {}, ns_client.scheduler.retries
+
+metrics.add_collector(cache_samples)
+
+# Tools are registered by the decorators above; write any schemas generated this run.
+schema_cache.save()
+
+def http_app():
+    """Starlette app of the HTTP transport; one per uvicorn worker, each with its own pool and caches."""
+    from http_transport import create_app
+
+    return create_app(mcp, shared_resources, os.getenv("MCP_API_KEY", ""))
+
+def run_http() -> None:
+    import uvicorn
+
+    host = os.getenv("MCP_HOST", "127.0.0.1")
+    port = int(os.getenv("MCP_PORT", "8000"))
+    workers = int(os.getenv("MCP_WORKERS", "1"))
+    logger.info("Serving MCP over HTTP on %s:%s with %s worker(s)", host, port, workers)
+    if workers > 1:
+        # Workers import this module by name and build their own app.
+        uvicorn.run("server:http_app", factory=True, host=host, port=port, workers=workers, log_level="warning")
+    else:
+        uvicorn.run(http_app(), host=host, port=port, log_level="warning")
 
 if __name__ == "__main__":
     logger.info("Starting NetSuite MCP server")
-    # Validate MCP_API_KEY before starting
+    # Validate MCP_API_KEY before starting; the HTTP transport also checks it on every request.
     api_key = os.getenv("MCP_API_KEY")
     if not api_key:
         logger.error("Missing MCP_API_KEY environment variable")
         print("Error: Missing MCP_API_KEY environment variable", file=sys.stderr)
         sys.exit(1)
     if api_key != "default_key":
-        logger.error(f"Invalid MCP_API_KEY: {api_key}")
+        logger.error("Invalid MCP_API_KEY: %s", api_key)
         print(f"Error: Invalid MCP_API_KEY: {api_key}", file=sys.stderr)
         sys.exit(1)
     logger.info("MCP_API_KEY validated successfully")
+    transport = os.getenv("MCP_TRANSPORT", "stdio")
     try:
-        mcp.run(transport="stdio")
+        if transport == "http":
+            run_http()
+        else:
+            mcp.run(transport="stdio")
         logger.info("NetSuite MCP server is running, waiting for client requests")
     except Exception as e:
-        logger.error(f"Server failed: {str(e)}")
+        logger.error("Server failed: %s", e)
         print(f"Server failed with error: {str(e)}\n{traceback.format_exc()}", file=sys.stderr)
-        raise
\ No newline at end of file
+        raise
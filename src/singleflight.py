@@ -0,0 +1,43 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one upstream request.
+
+    The first caller for a key starts the call; callers that arrive while it is
+    still running await the same task and receive the same result (or error).
+    Results are shared objects, so callers must treat them as read-only.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(method: str, endpoint: str, body: Optional[Dict[str, Any]] = None,
+            params: Optional[Dict[str, Any]] = None) -> str:
+        return json.dumps([method, endpoint, body, params], sort_keys=True, separators=(",", ":"), default=str)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # Shield so one cancelled caller does not cancel the call for the others.
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Mark the error as retrieved even if every waiter was cancelled.
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
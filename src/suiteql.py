@@ -0,0 +1,195 @@
+import asyncio
+import os
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, List, NamedTuple, Optional
+
+from netsuite_client import NetSuiteClient
+
+SUITEQL_PATH = "/services/rest/query/v1/suiteql"
+MAX_PAGE_SIZE = 1000
+# Upper bound on parallel page requests, kept under the account's concurrency limit.
+CONCURRENCY_LIMIT = int(os.getenv("NETSUITE_CONCURRENCY_LIMIT", "5"))
+
+
+# Keywords that end a FROM list, including its joins (sqlparse groups "GROUP BY" and the like into one token).
+_END_OF_FROM = frozenset({"WHERE", "GROUP", "ORDER", "HAVING", "UNION", "INTERSECT", "MINUS", "EXCEPT", "FETCH",
+                          "LIMIT", "OFFSET", "START", "CONNECT"})
+
+
+class ParsedQuery(NamedTuple):
+    statement_type: Optional[str]
+    normalized: str
+    tables: FrozenSet[str]
+
+
+@lru_cache(maxsize=1024)
+def parse_query(query: str) -> ParsedQuery:
+    """Parse and canonicalize a SuiteQL query once per distinct query string.
+
+    The normalized form drops comments and redundant whitespace, upper-cases
+    keywords and rewrites numeric literals, so queries that differ only in layout
+    share one cache key. String literals and identifiers are kept verbatim.
+    """
+    # Imported on first use; sqlparse is the slowest import on the startup path.
+    import sqlparse
+    from sqlparse import tokens as T
+
+    statements = sqlparse.parse(query)
+    if not statements:
+        return ParsedQuery(None, "", frozenset())
+    statement = statements[0]
+    parts: List[str] = []
+    tables = set()
+    expect_table = False
+    # Parenthesis depths with an open FROM list, where a comma introduces another table.
+    depth = 0
+    from_lists = set()
+    for token in statement.flatten():
+        if token.is_whitespace or token.ttype in T.Comment:
+            continue
+        value = token.value
+        if token.is_keyword or token.ttype in T.Operator.Comparison:
+            value = value.upper()
+        elif token.ttype in T.Number.Integer:
+            value = str(int(value))
+        elif token.ttype in T.Number.Float:
+            value = repr(float(value))
+        if expect_table and value != "(":
+            tables.add(token.value.lower())
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            from_lists.discard(depth)
+            depth -= 1
+        elif value == "FROM":
+            from_lists.add(depth)
+        elif token.is_keyword and value.split()[0] in _END_OF_FROM:
+            from_lists.discard(depth)
+        expect_table = value == "FROM" or value.endswith("JOIN") or (value == "," and depth in from_lists)
+        if parts and (value == "." or parts[-1].endswith(".")):
+            parts[-1] += value
+        else:
+            parts.append(value)
+    return ParsedQuery(statement.get_type(), " ".join(parts), frozenset(tables))
+
+
+def next_offset(page: Dict[str, Any], offset: int) -> Optional[int]:
+    """Return the offset of the page after ``page``, or None when it was the last one."""
+    items = page.get("items", [])
+    if not items:
+        return None
+    following = offset + len(items)
+    if "hasMore" in page:
+        return following if page["hasMore"] else None
+    if any(link.get("rel") == "next" for link in page.get("links", [])):
+        return following
+    return following if following < page.get("totalResults", 0) else None
+
+
+async def iter_suiteql_pages(
+    client: NetSuiteClient,
+    query: str,
+    page_size: int = MAX_PAGE_SIZE,
+    offset: int = 0,
+    max_rows: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield SuiteQL result pages, following ``hasMore`` until ``max_rows`` rows are read.
+
+    The request for the next page is started before the current page is yielded,
+    so the upstream round trip overlaps with whatever the consumer does with it.
+    At most two pages are held in memory at a time.
+    """
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    remaining = max_rows
+
+    def fetch(at: int) -> asyncio.Task:
+        # NetSuite requires the offset to be a multiple of the limit, so every page
+        # uses the same size and the last one is trimmed locally.
+        return asyncio.ensure_future(client.post(SUITEQL_PATH, {"q": query, "limit": page_size, "offset": at}))
+
+    pending: Optional[asyncio.Task] = fetch(offset)
+    try:
+        while pending is not None:
+            page = await pending
+            pending = None
+            items = page.get("items", [])
+            following = next_offset(page, offset)
+            if remaining is not None:
+                if len(items) > remaining:
+                    items = items[:remaining]
+                    following = offset + len(items)
+                remaining -= len(items)
+            if following is not None and (remaining is None or remaining > 0):
+                pending = fetch(following)
+            # Pages may be shared with coalesced callers, so never mutate them in place.
+            yield {**page, "items": items, "offset": offset, "nextOffset": following}
+            if following is None:
+                break
+            offset = following
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def iter_suiteql(
+    client: NetSuiteClient,
+    query: str,
+    page_size: int = MAX_PAGE_SIZE,
+    offset: int = 0,
+    max_rows: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield SuiteQL result rows one at a time across all pages."""
+    async for page in iter_suiteql_pages(client, query, page_size, offset, max_rows):
+        for row in page.get("items", []):
+            yield row
+
+
+async def fetch_suiteql_parallel(
+    client: NetSuiteClient,
+    query: str,
+    page_size: int = MAX_PAGE_SIZE,
+    offset: int = 0,
+    max_rows: int = 10000,
+    concurrency: int = CONCURRENCY_LIMIT,
+    on_page: Optional[Callable[[int, int], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """Read up to ``max_rows`` rows by fetching the remaining pages concurrently.
+
+    The first page is fetched on its own to learn ``totalResults``. The other
+    offsets are then requested at most ``concurrency`` at a time, capped by
+    ``NETSUITE_CONCURRENCY_LIMIT``, and reassembled in offset order. Queries
+    should have an ORDER BY so pages fetched in parallel are consistent.
+    ``on_page(rows_read, rows_expected)`` is awaited as each page arrives.
+    """
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    first = await client.post(SUITEQL_PATH, {"q": query, "limit": page_size, "offset": offset})
+    total = first.get("totalResults", 0)
+    end = min(total, offset + max_rows)
+    expected = max(end - offset, 0)
+    read = len(first.get("items", []))
+    if on_page is not None:
+        await on_page(min(read, expected), expected)
+    if next_offset(first, offset) is None:
+        offsets: List[int] = []
+    else:
+        offsets = list(range(offset + page_size, end, page_size))
+
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, CONCURRENCY_LIMIT)))
+
+    async def fetch(at: int) -> List[Dict[str, Any]]:
+        nonlocal read
+        async with semaphore:
+            page = await client.post(SUITEQL_PATH, {"q": query, "limit": page_size, "offset": at})
+        items = page.get("items", [])
+        read += len(items)
+        if on_page is not None:
+            await on_page(min(read, expected), expected)
+        return items
+
+    pages = await asyncio.gather(*(fetch(at) for at in offsets))
+    items = list(first.get("items", []))
+    for page in pages:
+        items.extend(page)
+    items = items[:max_rows]
+    following = offset + len(items) if offset + len(items) < total else None
+    return {"items": items, "totalResults": total, "hasMore": following is not None, "nextOffset": following}
@@ -0,0 +1,400 @@
+"""Benchmark harness for the MCP tool surface.
+
+Starts ``src/server.py`` over stdio and drives every tool it lists through a real
+MCP session, with ``--concurrency`` calls in flight, either against the mock
+backend or against ``NetSuiteStub`` with injected upstream latency. Reports the
+time until the first ``tools/list`` answer, p50/p95/p99 latency per tool and
+calls per second, and can save the report as a JSON baseline or compare a run
+against one::
+
+    python tests/benchmark.py --mode mock --save bench/mock.json
+    python tests/benchmark.py --mode stub --latency 0.02 --baseline bench/stub.json
+
+The comparison exits with status 1 when startup, a tool's p95 or the throughput
+regressed by more than ``--tolerance``, so CI can fail the build.
+
+``--compare`` runs one of the before/after comparisons in ``COMPARISONS``
+instead, and only prints the timings::
+
+    python tests/benchmark.py --compare fanout
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import logging.handlers
+import math
+import os
+import platform
+import queue
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from unittest import mock
+
+import httpx
+import pydantic_core
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+SERVER = os.path.join(SRC, "server.py")
+sys.path.insert(0, SRC)
+
+from json_codec import RawJSON, dumps  # noqa: E402
+from logger import SAMPLED, LazyQueueHandler, TruncatingFormatter  # noqa: E402
+from netsuite_client import NetSuiteClient  # noqa: E402
+from netsuite_stub import NetSuiteStub  # noqa: E402
+from suiteql import fetch_suiteql_parallel, iter_suiteql  # noqa: E402
+
+# Arguments of one representative call per tool, valid in mock mode and against the stub.
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "fetch_customer": {"input": {"customer_id": "123456"}},
+    "create_customer": {"input": {"company_name": "Bench Co", "email": "bench@example.com", "subsidiary": "1"}},
+    "search_customers": {"input": {"query": "acme"}},
+    "fetch_sales_order": {"input": {"sales_order_id": "987654"}},
+    "create_sales_order": {"input": {"customer_id": "123456", "item_id": "789", "quantity": 1}},
+    "fetch_invoice": {"input": {"invoice_id": "456789"}},
+    "create_invoice": {"input": {"sales_order_id": "987654", "amount": 10.0}},
+    "fetch_record": {"input": {"record_type": "customer", "record_id": "123456"}},
+    "create_record": {"input": {"record_type": "customer", "payload": {"companyName": "Bench Record"}}},
+    "update_record": {"input": {"record_type": "customer", "record_id": "123456", "payload": {"email": "bench@acme.com"}}},
+    "execute_suiteql": {"input": {"query": "SELECT id, companyName FROM customer WHERE companyName LIKE '%Acme%'"}},
+    "fetch_metadata": {},
+    "fetch_records_batch": {"input": {"records": [{"record_type": "customer", "record_id": "123456"},
+                                                  {"record_type": "invoice", "record_id": "456789"}]}},
+    "create_records_batch": {"input": {"records": [{"record_type": "customer", "payload": {"companyName": "Bench Batch"}}]}},
+    "update_records_batch": {"input": {"records": [{"record_type": "customer", "record_id": "123456",
+                                                    "payload": {"email": "batch@acme.com"}}]}},
+    "sync_records": {"input": {"record_type": "customer"}},
+    "get_server_stats": {},
+}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``samples``, which must be sorted."""
+    if not samples:
+        return 0.0
+    rank = math.ceil(round(q * len(samples), 9))
+    return samples[min(len(samples), max(1, rank)) - 1]
+
+
+def summarize(latencies: List[float], errors: int) -> Dict[str, Any]:
+    samples = sorted(latencies)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "mean": round(sum(samples) / len(samples), 6) if samples else 0.0,
+        "p50": round(percentile(samples, 0.50), 6),
+        "p95": round(percentile(samples, 0.95), 6),
+        "p99": round(percentile(samples, 0.99), 6),
+    }
+
+
+async def drive(session: ClientSession, tools: List[str], calls: int, concurrency: int) -> Dict[str, Any]:
+    """Issue ``calls`` tool calls round-robin over ``tools``, ``concurrency`` at a time."""
+    latencies: Dict[str, List[float]] = {name: [] for name in tools}
+    errors: Dict[str, int] = {name: 0 for name in tools}
+    schedule = itertools.islice(itertools.cycle(tools), calls)
+
+    async def worker() -> None:
+        for name in schedule:
+            started = time.perf_counter()
+            result = await session.call_tool(name, SCENARIOS[name])
+            latencies[name].append(time.perf_counter() - started)
+            errors[name] += bool(result.isError)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    return {
+        "calls": calls,
+        "duration": round(duration, 6),
+        "calls_per_second": round(calls / duration, 2),
+        "overall": summarize([value for values in latencies.values() for value in values], sum(errors.values())),
+        "tools": {name: summarize(latencies[name], errors[name]) for name in tools},
+    }
+
+
+async def run_benchmark(mode: str = "mock", calls: int = 200, concurrency: int = 8, latency: float = 0.01,
+                        env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Run one benchmark against a fresh server and return the report."""
+    server_env = {**os.environ, "MCP_API_KEY": "default_key", "NETSUITE_LOG_LEVEL": "WARNING",
+                  "FASTMCP_LOG_LEVEL": "WARNING", **(env or {})}
+    stub = None
+    if mode == "stub":
+        stub = NetSuiteStub(latency=latency)
+        await stub.start()
+        server_env.update(NETSUITE_MOCK="false", NETSUITE_BASE_URL=stub.base_url, NETSUITE_ACCESS_TOKEN="bench")
+    elif mode == "mock":
+        server_env["NETSUITE_MOCK"] = "true"
+    else:
+        raise ValueError(f"Unknown benchmark mode: {mode}")
+    try:
+        params = StdioServerParameters(command=sys.executable, args=[SERVER], env=server_env)
+        started = time.perf_counter()
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                initialized = time.perf_counter()
+                tools = [tool.name for tool in (await session.list_tools()).tools]
+                # Time from spawning the server until a client can see its tools.
+                startup = {"initialize": round(initialized - started, 6),
+                           "first_list_tools": round(time.perf_counter() - started, 6)}
+                missing = [name for name in tools if name not in SCENARIOS]
+                if missing:
+                    raise ValueError(f"No benchmark scenario for tools: {', '.join(missing)}")
+                # One untimed call per tool, so first-call setup is not counted.
+                await drive(session, tools, len(tools), 1)
+                report = await drive(session, tools, calls, concurrency)
+    finally:
+        if stub is not None:
+            await stub.close()
+    report.update(startup=startup, mode=mode, concurrency=concurrency, latency=latency if mode == "stub" else 0.0,
+                  python=platform.python_version(), machine=platform.machine())
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25,
+            min_delta: float = 0.002, min_startup_delta: float = 0.05) -> List[str]:
+    """Regressions of ``report`` against ``baseline``, as readable lines.
+
+    A tool regresses when its p95 is more than ``tolerance`` (relative) and
+    ``min_delta`` seconds slower; the run regresses when its throughput drops by
+    more than ``tolerance``, or when the first ``tools/list`` answer comes more
+    than ``tolerance`` and ``min_startup_delta`` seconds later.
+    """
+    settings = ("mode", "concurrency", "latency")
+    if any(report.get(key) != baseline.get(key) for key in settings):
+        return ["baseline was recorded with different settings: " +
+                ", ".join(f"{key} {baseline.get(key)} vs {report.get(key)}" for key in settings)]
+    regressions = []
+    expected = baseline["calls_per_second"] * (1 - tolerance)
+    if report["calls_per_second"] < expected:
+        regressions.append(f"throughput {report['calls_per_second']:.1f} calls/s < {expected:.1f} "
+                           f"(baseline {baseline['calls_per_second']:.1f})")
+    before, after = (run.get("startup", {}).get("first_list_tools") for run in (baseline, report))
+    if (before is not None and after is not None
+            and after > before * (1 + tolerance) and after - before > min_startup_delta):
+        regressions.append(f"first list_tools after {after * 1000:.0f} ms > baseline {before * 1000:.0f} ms")
+    for name, stats in report["tools"].items():
+        before = baseline["tools"].get(name)
+        if before is None:
+            continue
+        if stats["p95"] > before["p95"] * (1 + tolerance) and stats["p95"] - before["p95"] > min_delta:
+            regressions.append(f"{name} p95 {stats['p95'] * 1000:.1f} ms > baseline {before['p95'] * 1000:.1f} ms")
+        if stats["errors"] > before["errors"]:
+            regressions.append(f"{name} errors {stats['errors']} > baseline {before['errors']}")
+    return regressions
+
+
+async def compare_fanout(pages: int = 20, page_size: int = 100, latency: float = 0.05,
+                         concurrency: int = 5) -> Dict[str, Any]:
+    """Sequential SuiteQL paging against the parallel fan-out, on the stub with ``latency`` per page."""
+    rows = [{"id": str(n)} for n in range(pages * page_size)]
+    query = "SELECT id FROM customer"
+    with mock.patch.dict(os.environ, NETSUITE_MOCK="false"):
+        async with NetSuiteStub(suiteql_rows=rows, latency=latency) as stub:
+            client = NetSuiteClient(stub.base_url)
+            try:
+                started = time.perf_counter()
+                sequential = [row async for row in iter_suiteql(client, query, page_size=page_size)]
+                sequential_seconds = time.perf_counter() - started
+                started = time.perf_counter()
+                parallel = await fetch_suiteql_parallel(client, query, page_size=page_size, max_rows=len(rows),
+                                                        concurrency=concurrency)
+                parallel_seconds = time.perf_counter() - started
+            finally:
+                await client.close()
+    if sequential != rows or parallel["items"] != rows:
+        raise RuntimeError("sequential and parallel paging returned different rows")
+    return {"summary": f"{pages} pages @ {latency * 1000:.0f} ms", "before": ("sequential", sequential_seconds),
+            "after": (f"fan-out({concurrency})", parallel_seconds)}
+
+
+async def compare_logging(calls: int = 2000) -> Dict[str, Any]:
+    """Per-request log lines as the original logger wrote them, against the queued pipeline of logger.py."""
+    endpoint = "record/v1/customer"
+    payload = {"items": [{"id": str(n), "companyName": f"Customer {n}"} for n in range(200)]}
+    elapsed = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Before: the whole response is formatted in the caller and written before the call returns.
+        eager = logging.getLogger("benchmark.eager")
+        eager.propagate = False
+        eager.setLevel(logging.INFO)
+        output = logging.FileHandler(os.path.join(directory, "eager.log"))
+        output.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        eager.addHandler(output)
+        started = time.perf_counter()
+        for _ in range(calls):
+            eager.info(f"GET request for endpoint: {endpoint}, response: {payload}")
+        elapsed["eager"] = time.perf_counter() - started
+        eager.removeHandler(output)
+        output.close()
+
+        # After: the record is queued and formatted and written by the listener thread.
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        output = logging.FileHandler(os.path.join(directory, "queued.log"))
+        output.setFormatter(TruncatingFormatter())
+        listener = logging.handlers.QueueListener(records, output)
+        lazy = logging.getLogger("benchmark.queued")
+        lazy.propagate = False
+        lazy.setLevel(logging.INFO)
+        handler = LazyQueueHandler(records)
+        lazy.addHandler(handler)
+        listener.start()
+        started = time.perf_counter()
+        for _ in range(calls):
+            lazy.info("GET request for endpoint: %s, response: %s", endpoint, payload, extra=SAMPLED)
+        elapsed["queued"] = time.perf_counter() - started
+        listener.stop()
+        lazy.removeHandler(handler)
+        output.close()
+    return {"summary": f"{calls} log calls", "before": ("synchronous", elapsed["eager"]),
+            "after": ("queued", elapsed["queued"])}
+
+
+async def _stdio_agent(env: Dict[str, str], name: str, arguments: Dict[str, Any], calls: int) -> None:
+    params = StdioServerParameters(command=sys.executable, args=[SERVER], env=env)
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for _ in range(calls):
+                result = await session.call_tool(name, arguments)
+                if result.isError:
+                    raise RuntimeError(f"{name} failed over stdio")
+
+
+async def _http_agent(url: str, api_key: str, name: str, arguments: Dict[str, Any], calls: int) -> None:
+    async with httpx.AsyncClient(base_url=url, headers={"Authorization": f"Bearer {api_key}"}) as http:
+        for call in range(calls):
+            message = {"jsonrpc": "2.0", "id": call, "method": "tools/call",
+                       "params": {"name": name, "arguments": arguments}}
+            reply = (await http.post("/mcp", json=message)).json()
+            if "result" not in reply or reply["result"].get("isError"):
+                raise RuntimeError(f"{name} failed over HTTP: {reply}")
+
+
+async def compare_transports(clients: int = 4, calls: int = 25, workers: int = 2) -> Dict[str, Any]:
+    """Agents each spawning a stdio server, against the same agents sharing one HTTP server.
+
+    The HTTP server is started before timing starts: it is long-lived and its
+    startup is not paid per agent, which is the point of sharing it.
+    """
+    name, arguments = "fetch_customer", SCENARIOS["fetch_customer"]
+    env = {**os.environ, "MCP_API_KEY": "default_key", "NETSUITE_MOCK": "true", "NETSUITE_LOG_LEVEL": "WARNING",
+           "FASTMCP_LOG_LEVEL": "WARNING"}
+    started = time.perf_counter()
+    await asyncio.gather(*(_stdio_agent(env, name, arguments, calls) for _ in range(clients)))
+    stdio_seconds = time.perf_counter() - started
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen([sys.executable, SERVER], stderr=subprocess.DEVNULL,
+                               env={**env, "MCP_TRANSPORT": "http", "MCP_PORT": str(port), "MCP_WORKERS": str(workers)})
+    try:
+        deadline = time.monotonic() + 60
+        async with httpx.AsyncClient() as http:
+            while True:
+                try:
+                    if (await http.get(f"{url}/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("HTTP server did not start")
+                await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        await asyncio.gather(*(_http_agent(url, "default_key", name, arguments, calls) for _ in range(clients)))
+        http_seconds = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {"summary": f"{clients} agents x {calls} calls", "before": ("stdio per agent", stdio_seconds),
+            "after": (f"shared HTTP ({workers} workers)", http_seconds)}
+
+
+async def compare_serialization(rows: int = 1000, rounds: int = 20) -> Dict[str, Any]:
+    """A page of upstream JSON decoded and re-encoded the way FastMCP does it, against passing its bytes through."""
+    page = {"items": [{"id": str(n), "companyName": f"Customer {n}", "email": f"c{n}@example.com",
+                       "balance": n * 1.5, "subsidiary": {"id": "1"}} for n in range(rows)], "totalResults": rows}
+    upstream = json.dumps(page).encode()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        pydantic_core.to_json(json.loads(upstream), fallback=str, indent=2).decode()
+    default_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(rounds):
+        dumps(RawJSON(upstream)).decode()
+    raw_seconds = time.perf_counter() - started
+    return {"summary": f"{rounds} pages of {rows} rows", "before": ("decode + default encoder", default_seconds),
+            "after": ("RawJSON pass-through", raw_seconds)}
+
+
+# Before/after comparisons selectable with --compare; each returns the two timings it made.
+COMPARISONS: Dict[str, Callable[[], Awaitable[Dict[str, Any]]]] = {
+    "fanout": compare_fanout,
+    "logging": compare_logging,
+    "serialization": compare_serialization,
+    "transports": compare_transports,
+}
+
+
+def format_comparison(result: Dict[str, Any]) -> str:
+    (before, before_seconds), (after, after_seconds) = result["before"], result["after"]
+    return (f"{result['summary']}: {before} {before_seconds * 1000:.1f} ms, {after} {after_seconds * 1000:.1f} ms, "
+            f"speedup {before_seconds / after_seconds:.1f}x")
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{report['mode']}: {report['calls']} calls, concurrency {report['concurrency']}, "
+             f"{report['calls_per_second']:.1f} calls/s",
+             f"startup: initialize {report['startup']['initialize'] * 1000:.0f} ms, "
+             f"first list_tools {report['startup']['first_list_tools'] * 1000:.0f} ms",
+             f"{'tool':<24}{'count':>7}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"]
+    for name, stats in sorted(report["tools"].items()) + [("overall", report["overall"])]:
+        lines.append(f"{name:<24}{stats['count']:>7}{stats['errors']:>7}{stats['p50'] * 1000:>9.2f}"
+                     f"{stats['p95'] * 1000:>9.2f}{stats['p99'] * 1000:>9.2f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every MCP tool of the NetSuite server.")
+    parser.add_argument("--mode", choices=["mock", "stub"], default="mock",
+                        help="mock backend, or the local NetSuite stub with injected latency")
+    parser.add_argument("--calls", type=int, default=500, help="Timed tool calls")
+    parser.add_argument("--concurrency", type=int, default=8, help="Tool calls in flight")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub response delay in seconds")
+    parser.add_argument("--save", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON report and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--compare", choices=sorted(COMPARISONS), help="Run a before/after comparison instead")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print(format_comparison(asyncio.run(COMPARISONS[args.compare]())))
+        return 0
+
+    report = asyncio.run(run_benchmark(args.mode, args.calls, args.concurrency, args.latency))
+    print(format_report(report))
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
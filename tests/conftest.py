@@ -0,0 +1,27 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# The server modules import each other as top-level modules (PYTHONPATH=src).
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+MOCK_FILE = os.path.join(os.path.dirname(__file__), "..", "mocks", "netsuite.json")
+
+
+def pytest_configure(config):
+    # Servers imported or spawned by the tests cache tool schemas here instead of in ~/.cache.
+    # Set before collection, which imports server.py.
+    directory = tempfile.mkdtemp(prefix="mcp-netsuite-schemas-")
+    os.environ["NETSUITE_SCHEMA_CACHE"] = directory
+    config.add_cleanup(lambda: shutil.rmtree(directory, ignore_errors=True))
+
+
+@pytest.fixture
+def live_env(monkeypatch):
+    """Talk to NetSuite (the test stub) instead of the in-process mock backend."""
+    monkeypatch.setenv("NETSUITE_MOCK", "false")
+    monkeypatch.setenv("NETSUITE_ACCESS_TOKEN", "token")
@@ -0,0 +1,135 @@
+"""A small stand-in for the NetSuite REST API used by the live-mode tests.
+
+It speaks plain HTTP/1.1 with keep-alive over asyncio streams and serves the
+records from ``mocks/netsuite.json``, so tests can point ``NetSuiteClient`` at
+it and observe how many TCP connections and requests actually reach the wire.
+With ``max_concurrency`` set it answers requests above that many in flight with
+429 / CONCURRENCY_LIMIT_EXCEEDED, like NetSuite's account governance does.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from conftest import MOCK_FILE
+
+
+class NetSuiteStub:
+    def __init__(self, records: Optional[Dict[str, Any]] = None, suiteql_rows: Optional[List[Dict[str, Any]]] = None,
+                 latency: float = 0.0, max_concurrency: Optional[int] = None):
+        if records is None:
+            with open(MOCK_FILE) as f:
+                records = json.load(f)
+        self.records = records
+        self.suiteql_rows = suiteql_rows if suiteql_rows is not None else records["query/v1/suiteql"]["items"]
+        self.latency = latency
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.throttled = 0
+        self.connections = 0
+        self.requests: List[Dict[str, Any]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.base_url
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "NetSuiteStub":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        connection = self.connections
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode().strip()
+                    if not line:
+                        break
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                url = urlsplit(target)
+                request = {
+                    "method": method,
+                    "path": url.path,
+                    "params": {k: v[0] for k, v in parse_qs(url.query).items()},
+                    "headers": headers,
+                    "body": json.loads(body) if body else None,
+                    "connection": connection,
+                }
+                self.requests.append(request)
+                self.active += 1
+                try:
+                    if self.max_concurrency is not None and self.active > self.max_concurrency:
+                        self.throttled += 1
+                        status, payload, extra = 429, _error(429, "Concurrent request limit exceeded", "CONCURRENCY_LIMIT_EXCEEDED"), {}
+                    else:
+                        if self.latency:
+                            await asyncio.sleep(self.latency)
+                        status, payload, extra = self.respond(request)
+                finally:
+                    self.active -= 1
+                data = json.dumps(payload).encode() if payload is not None else b""
+                head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}", f"Content-Length: {len(data)}",
+                        "Content-Type: application/json", "Connection: keep-alive"]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, request: Dict[str, Any]):
+        """Return ``(status, payload, extra_headers)`` for a parsed request."""
+        key = request["path"].removeprefix("/services/rest/")
+        method = request["method"]
+        if key == "query/v1/suiteql" and method == "POST":
+            limit = int(request["params"].get("limit", 1000))
+            offset = int(request["params"].get("offset", 0))
+            items = self.suiteql_rows[offset:offset + limit]
+            has_more = offset + len(items) < len(self.suiteql_rows)
+            links = [{"rel": "self", "href": f"{self.base_url}{request['path']}?limit={limit}&offset={offset}"}]
+            if has_more:
+                links.append({"rel": "next", "href": f"{self.base_url}{request['path']}?limit={limit}&offset={offset + limit}"})
+            return 200, {"links": links, "count": len(items), "hasMore": has_more, "items": items,
+                         "offset": offset, "totalResults": len(self.suiteql_rows)}, {}
+        if method == "GET":
+            if key in self.records:
+                return 200, self.records[key], {}
+            return 404, _error(404, f"The record instance does not exist: {key}"), {}
+        if method == "POST":
+            record_id = str(900000 + len(self.requests))
+            return 204, None, {"Location": f"{self.base_url}{request['path']}/{record_id}"}
+        if method == "PATCH":
+            if key not in self.records:
+                return 404, _error(404, f"The record instance does not exist: {key}"), {}
+            return 204, None, {"Location": f"{self.base_url}{request['path']}"}
+        return 405, _error(405, f"Method {method} not allowed"), {}
+
+
+def _error(status: int, detail: str, code: str = "INVALID_REQUEST") -> Dict[str, Any]:
+    return {"title": _REASONS.get(status, "Error"), "status": status,
+            "o:errorDetails": [{"detail": detail, "o:errorCode": code}]}
+
+
+_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 429: "Too Many Requests"}
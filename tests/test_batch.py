@@ -0,0 +1,54 @@
+import asyncio
+
+import server
+from cache import RecordCache
+
+
+def test_fetch_records_batch_reports_per_item_results(monkeypatch):
+    monkeypatch.setattr(server, "record_cache", RecordCache())
+    records = [
+        {"record_type": "customer", "record_id": "123456"},
+        {"record_type": "invoice", "record_id": "456789"},
+        {"record_type": "customer", "record_id": "1"},
+        {"record_type": "widget", "record_id": "2"},
+        {"record_type": "customer", "record_id": "123456"},
+    ]
+
+    result = asyncio.run(server.fetch_records_batch(server.BatchFetchInput(records=records)))
+
+    assert (result["succeeded"], result["failed"]) == (3, 2)
+    assert [item["index"] for item in result["results"]] == list(range(5))
+    assert result["results"][0]["data"]["companyName"] == "Acme Corp"
+    assert result["results"][2]["error"]["code"] == "INVALID_PARAMS"
+    assert result["results"][3]["error"] == {"code": "INVALID_PARAMS", "message": "Invalid record type: widget"}
+    assert server.record_cache.stats()["hits"] == 1
+
+
+def test_batch_writes_respect_concurrency_and_invalidate(monkeypatch):
+    monkeypatch.setattr(server, "record_cache", RecordCache())
+    server.record_cache.put("customer", "123456", {"id": "123456"})
+    active = 0
+    peak = 0
+
+    async def slow_patch(endpoint, data, *args, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {"id": endpoint.rsplit("/", 1)[-1], "status": "updated"}
+
+    monkeypatch.setattr(server.ns_client, "patch", slow_patch)
+    records = [{"record_type": "customer", "record_id": str(123450 + n), "payload": {"email": "a@b.c"}} for n in range(10)]
+
+    result = asyncio.run(server.update_records_batch(server.BatchUpdateInput(records=records, concurrency=3)))
+
+    assert result["succeeded"] == 10
+    assert peak == 3
+    assert server.record_cache.get("customer", "123456") is None
+
+    created = asyncio.run(server.create_records_batch(server.BatchCreateInput(records=[
+        {"record_type": "vendorBill", "payload": {"entity": {"id": "445566"}}},
+        {"record_type": "widget", "payload": {}},
+    ])))
+    assert [item["ok"] for item in created["results"]] == [True, False]
@@ -0,0 +1,79 @@
+import asyncio
+import copy
+import json
+
+import pytest
+
+from benchmark import COMPARISONS, SCENARIOS, compare, format_comparison, main, percentile, run_benchmark
+
+
+def test_percentile_is_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+    assert (percentile(samples, 0.5), percentile(samples, 0.95), percentile(samples, 0.99)) == (50.0, 95.0, 99.0)
+    assert percentile([3.0], 0.99) == 3.0 and percentile([], 0.5) == 0.0
+
+
+@pytest.mark.parametrize("mode", ["mock", "stub"])
+def test_benchmark_drives_every_tool(mode):
+    calls = 2 * len(SCENARIOS)
+    report = asyncio.run(run_benchmark(mode, calls=calls, concurrency=4, latency=0.005))
+    print(f"{mode}: {report['calls_per_second']:.0f} calls/s, overall p95 {report['overall']['p95'] * 1000:.1f} ms")
+    assert report["overall"]["count"] == calls and report["overall"]["errors"] == 0
+    # The tools come from the server's tools/list answer, and every one has a scenario.
+    assert sorted(report["tools"]) == sorted(SCENARIOS)
+    assert 0 < report["startup"]["initialize"] < report["startup"]["first_list_tools"]
+    assert all(stats["count"] == 2 for stats in report["tools"].values())
+    assert all(stats["p50"] <= stats["p95"] <= stats["p99"] for stats in report["tools"].values())
+    if mode == "stub":
+        # Every tool reaches NetSuite or a cache warmed by it, never faster than one round trip on a miss.
+        assert report["tools"]["create_customer"]["p50"] >= 0.005
+
+
+def test_baseline_comparison_flags_regressions(tmp_path):
+    baseline = {"mode": "mock", "concurrency": 8, "latency": 0.0, "calls_per_second": 100.0,
+                "tools": {"fetch_customer": {"p95": 0.010, "errors": 0}, "sync_records": {"p95": 0.010, "errors": 0}}}
+    report = copy.deepcopy(baseline)
+    assert compare(report, baseline) == []
+
+    report["tools"]["fetch_customer"]["p95"] = 0.020
+    report["tools"]["sync_records"]["p95"] = 0.0115  # within tolerance
+    report["calls_per_second"] = 60.0
+    regressions = compare(report, baseline)
+    assert len(regressions) == 2 and regressions[1].startswith("fetch_customer p95")
+    assert "different settings" in compare({**report, "mode": "stub"}, baseline)[0]
+
+    started = {**baseline, "startup": {"first_list_tools": 0.5}}
+    assert compare({**started, "startup": {"first_list_tools": 0.54}}, started) == []
+    assert compare({**started, "startup": {"first_list_tools": 0.8}}, started)[0].startswith("first list_tools")
+
+    path = tmp_path / "baseline.json"
+    assert main(["--calls", str(len(SCENARIOS)), "--concurrency", "2", "--save", str(path)]) == 0
+    saved = json.loads(path.read_text())
+    saved["calls_per_second"] *= 100
+    path.write_text(json.dumps(saved))
+    assert main(["--calls", str(len(SCENARIOS)), "--concurrency", "2", "--baseline", str(path)]) == 1
+
+
+def test_fanout_comparison_reads_the_same_rows():
+    result = asyncio.run(COMPARISONS["fanout"](pages=4, page_size=10, latency=0.005))
+    print(format_comparison(result))
+    assert result["before"][1] > 0 and result["after"][1] > 0
+
+
+def test_logging_comparison_times_both_pipelines():
+    result = asyncio.run(COMPARISONS["logging"](calls=50))
+    print(format_comparison(result))
+    assert result["before"][0] == "synchronous" and result["after"][1] > 0
+
+
+def test_serialization_comparison_times_both_encodings():
+    result = asyncio.run(COMPARISONS["serialization"](rows=50, rounds=2))
+    print(format_comparison(result))
+    assert result["before"][0] == "decode + default encoder" and result["after"][1] > 0
+
+
+def test_transport_comparison_serves_every_agent():
+    # Each agent raises if any of its calls fails over either transport.
+    result = asyncio.run(COMPARISONS["transports"](clients=2, calls=3))
+    print(format_comparison(result))
+    assert result["before"][0] == "stdio per agent" and result["after"][1] > 0
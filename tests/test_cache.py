@@ -0,0 +1,212 @@
+import asyncio
+import time
+
+from cache import MetadataCache, QueryResultCache, RecordCache, estimate_size, parse_table_ttls
+
+CATALOG = {"records": [{"type": "customer", "fields": [{"name": "email", "type": "string"}]}, {"type": "invoice"}]}
+
+
+def test_metadata_cache_stale_while_revalidate():
+    async def run():
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return CATALOG
+
+        cache = MetadataCache(loader, ttl=0.05)
+        first, second = await asyncio.gather(cache.get(), cache.get())
+        assert first is second and len(calls) == 1
+        assert first.record_types == frozenset({"customer", "invoice"})
+        assert first.fields["customer"] == {"email": "string"}
+
+        assert await cache.get() is first
+        await asyncio.sleep(0.06)
+        # Expired: the stale snapshot is served while one refresh runs in the background.
+        assert await cache.get() is first
+        assert await cache.get() is first
+        await asyncio.sleep(0.02)
+        assert len(calls) == 2
+        assert await cache.get() is not first
+
+        cache.invalidate()
+        await cache.get()
+        assert len(calls) == 3
+        assert cache.stats()["invalidations"] == 1
+        assert cache.stats()["stale_hits"] == 2
+
+    asyncio.run(run())
+
+
+def test_metadata_cache_keeps_stale_snapshot_on_error():
+    async def run():
+        results = [CATALOG, RuntimeError("boom")]
+
+        async def loader():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        cache = MetadataCache(loader, ttl=0)
+        snapshot = await cache.get()
+        assert await cache.get() is snapshot
+        await asyncio.sleep(0)
+        assert cache.stats()["refresh_errors"] == 1
+        assert await cache.get() is snapshot
+
+    asyncio.run(run())
+
+
+def test_metadata_invalidation_discards_refresh_in_flight(monkeypatch):
+    import server
+
+    async def run():
+        catalogs = [CATALOG, {"records": CATALOG["records"] + [{"type": "customrecord_new"}]}]
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def loader():
+            catalog = catalogs.pop(0)
+            if len(catalogs) == 1:
+                started.set()
+                await release.wait()
+            return catalog
+
+        cache = MetadataCache(loader, ttl=300)
+        monkeypatch.setattr(server, "metadata_cache", cache)
+        pending = asyncio.ensure_future(cache.get())
+        await started.wait()
+        # A custom record type was added while the first load was in flight.
+        refreshed = asyncio.ensure_future(server.fetch_metadata(refresh=True))
+        await asyncio.sleep(0)
+        release.set()
+        await pending
+        assert "customrecord_new" in {record["type"] for record in (await refreshed)["records"]}
+        assert "customrecord_new" in (await cache.get()).record_types
+        assert cache.stats()["invalidations"] == 1
+
+    asyncio.run(run())
+
+
+def test_record_cache_evicts_by_size_and_ttl():
+    cache = RecordCache(ttl=60, max_bytes=estimate_size({"id": "1", "name": "x" * 10}) * 2)
+    for record_id in ("1", "2", "3"):
+        cache.put("customer", record_id, {"id": record_id, "name": "x" * 10})
+    # Least recently used entry goes first once the size budget is exceeded.
+    assert cache.get("customer", "1") is None
+    assert cache.get("customer", "3") == {"id": "3", "name": "x" * 10}
+    cache.put("customer", "big", {"blob": "x" * 1000})
+    assert cache.get("customer", "big") is None
+
+    cache.invalidate("customer", "3")
+    assert cache.get("customer", "3") is None
+    assert cache.stats()["invalidations"] == 1
+
+    expiring = RecordCache(ttl=0.01)
+    expiring.put("invoice", "1", {"id": "1"})
+    time.sleep(0.02)
+    assert expiring.get("invoice", "1") is None
+
+
+def test_record_cache_skips_fetch_that_raced_an_invalidation():
+    async def run():
+        cache = RecordCache()
+        release = asyncio.Event()
+
+        async def fetch_old():
+            await release.wait()
+            return {"id": "1", "email": "old@example.com"}
+
+        pending = asyncio.ensure_future(cache.get_or_fetch("customer", "1", fetch_old))
+        await asyncio.sleep(0)
+        # An update lands while the read is in flight.
+        cache.invalidate("customer", "1")
+        release.set()
+        assert (await pending)["email"] == "old@example.com"
+        assert cache.get("customer", "1") is None
+
+        async def fetch_new():
+            return {"id": "1", "email": "new@example.com"}
+
+        await cache.get_or_fetch("customer", "1", fetch_new)
+        assert cache.get("customer", "1")["email"] == "new@example.com"
+
+        release.clear()
+        pending = asyncio.ensure_future(cache.get_or_fetch("invoice", "2", fetch_old))
+        await asyncio.sleep(0)
+        cache.invalidate_type("invoice")
+        release.set()
+        await pending
+        assert cache.get("invoice", "2") is None and not cache._fetching
+
+    asyncio.run(run())
+
+
+def test_server_reads_through_record_cache(monkeypatch):
+    import server
+
+    calls = []
+    original_get = server.ns_client.get
+
+    async def counting_get(endpoint, *args, **kwargs):
+        calls.append(endpoint)
+        return await original_get(endpoint, *args, **kwargs)
+
+    monkeypatch.setattr(server.ns_client, "get", counting_get)
+    monkeypatch.setattr(server, "record_cache", RecordCache())
+
+    async def run():
+        for _ in range(3):
+            await server.fetch_customer(server.CustomerInput(customer_id="123456"))
+        assert calls.count("/services/rest/record/v1/customer/123456") == 1
+
+        await server.update_record(server.UpdateRecordInput(record_type="customer", record_id="123456", payload={"email": "a@b.c"}))
+        await server.fetch_record(server.RecordInput(record_type="customer", record_id="123456"))
+        assert calls.count("/services/rest/record/v1/customer/123456") == 2
+
+    asyncio.run(run())
+
+
+def test_query_result_cache_uses_shortest_table_ttl():
+    cache = QueryResultCache(default_ttl=60, table_ttls=parse_table_ttls("transaction=0.01, item=0"))
+    assert cache.ttl_for({"customer", "transaction"}) == 0.01
+    cache.put(("q1",), frozenset({"customer"}), {"items": [1]})
+    cache.put(("q2",), frozenset({"customer", "transaction"}), {"items": [2]})
+    cache.put(("q3",), frozenset({"item"}), {"items": [3]})
+    assert cache.get(("q3",)) is None
+    time.sleep(0.02)
+    assert cache.get(("q1",)) == {"items": [1]}
+    assert cache.get(("q2",)) is None
+
+    cache.invalidate_table("Customer")
+    assert cache.get(("q1",)) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_server_caches_suiteql_by_normalized_query(monkeypatch):
+    import server
+
+    calls = []
+    original_post = server.ns_client.post
+
+    async def counting_post(endpoint, data, *args, **kwargs):
+        calls.append(data)
+        return await original_post(endpoint, data, *args, **kwargs)
+
+    monkeypatch.setattr(server.ns_client, "post", counting_post)
+    monkeypatch.setattr(server, "query_cache", QueryResultCache())
+
+    async def run():
+        for query in ("SELECT id FROM customer", "select id\n  from customer -- all", "SELECT id FROM customer"):
+            await server.execute_suiteql(server.ExecuteSuiteQLInput(query=query, limit=10))
+        assert len(calls) == 1
+        await server.execute_suiteql(server.ExecuteSuiteQLInput(query="SELECT id FROM customer", limit=10, offset=10))
+        assert len(calls) == 2
+
+        await server.create_customer(server.CreateCustomerInput(company_name="New Co", email="a@b.c", subsidiary="1"))
+        await server.execute_suiteql(server.ExecuteSuiteQLInput(query="SELECT id FROM customer", limit=10))
+        assert len([call for call in calls if call.get("q")]) == 3
+
+    asyncio.run(run())
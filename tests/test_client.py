@@ -15,7 +15,12 @@ TOOL_DESCRIPTIONS = {
     "create_record": "Create any NetSuite record",
     "update_record": "Update any NetSuite record",
     "execute_suiteql": "Execute a SuiteQL query",
-    "fetch_metadata": "Fetch NetSuite record metadata"
+    "fetch_metadata": "Fetch NetSuite record metadata",
+    "fetch_records_batch": "Fetch many NetSuite records in one call",
+    "create_records_batch": "Create many NetSuite records in one call",
+    "update_records_batch": "Update many NetSuite records in one call",
+    "sync_records": "Fetch records changed since the last sync and refresh them in the cache",
+    "get_server_stats": "Latency, cache and throttling statistics of this server"
 }
 
 async def run_client():
@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+AUTH = {"Authorization": "Bearer default_key"}
+FETCH = {"name": "fetch_customer", "arguments": {"input": {"customer_id": "123456"}}}
+
+
+def _rpc(method: str, params=None, id=1):
+    message = {"jsonrpc": "2.0", "id": id, "method": method}
+    if params is not None:
+        message["params"] = params
+    return message
+
+
+def test_api_key_is_checked_on_every_request(monkeypatch):
+    import server
+
+    monkeypatch.setenv("MCP_API_KEY", "default_key")
+
+    async def run():
+        app = server.http_app()
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                assert (await client.post("/mcp", json=_rpc("tools/list"))).status_code == 401
+                wrong = {"Authorization": "Bearer not_the_key"}
+                assert (await client.post("/mcp", json=_rpc("tools/list"), headers=wrong)).status_code == 401
+                assert (await client.get("/sse", headers={"X-API-Key": "nope"})).status_code == 401
+                assert (await client.get("/health")).status_code == 200
+
+                tools = (await client.post("/mcp", json=_rpc("tools/list"), headers=AUTH)).json()
+                assert "fetch_customer" in [tool["name"] for tool in tools["result"]["tools"]]
+                reply = await client.post("/mcp", json=_rpc("tools/call", FETCH, id="a"),
+                                          headers={"X-API-Key": "default_key"})
+                assert reply.json()["id"] == "a" and "Acme Corp" in reply.json()["result"]["content"][0]["text"]
+                notification = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+                assert (await client.post("/mcp", json=notification, headers=AUTH)).status_code == 202
+                assert (await client.post("/mcp", content=b"{", headers=AUTH)).status_code == 400
+            assert server._resource_users == 1
+        assert server._resource_users == 0
+
+    asyncio.run(run())
+
+
+def test_unknown_fastmcp_layout_fails_when_the_app_is_built():
+    from http_transport import create_app
+
+    with pytest.raises(RuntimeError, match="does not support mcp"):
+        create_app(SimpleNamespace(), None, "default_key")
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pydantic_core
+from mcp.types import TextContent
+
+import server
+from cache import RecordCache, estimate_size
+from json_codec import RawJSON, dumps
+from netsuite_client import NetSuiteClient
+from netsuite_stub import NetSuiteStub
+
+
+def test_to_content_encodes_every_result_type_as_text():
+    assert server.to_content("plain")[0].text == "plain"
+    assert json.loads(server.to_content([{"id": "1"}, None])[0].text) == [{"id": "1"}, None]
+    text = TextContent(type="text", text="already content")
+    assert server.to_content(text) == [text]
+
+
+def test_raw_json_is_decoded_only_when_read():
+    raw = RawJSON(b'{"id": "1", "items": [1, 2]}')
+    assert dumps(raw) is raw.raw and estimate_size(raw) == len(raw.raw)
+    assert json.loads(dumps({"page": raw, "ok": True})) == {"page": {"id": "1", "items": [1, 2]}, "ok": True}
+    assert raw["items"] == [1, 2] and raw == {"id": "1", "items": [1, 2]} and {**raw}["id"] == "1"
+
+
+def test_live_responses_pass_through_undecoded(monkeypatch):
+    monkeypatch.setenv("NETSUITE_MOCK", "false")
+
+    async def run():
+        async with NetSuiteStub() as stub:
+            client = NetSuiteClient(stub.base_url, access_token="token")
+            record = await client.get("/services/rest/record/v1/customer/123456")
+            assert isinstance(record, RawJSON)
+            assert server.to_content(record)[0].text == json.dumps(stub.records["record/v1/customer/123456"])
+            assert not record.decoded
+
+            monkeypatch.setattr(server, "ns_client", client)
+            monkeypatch.setattr(server, "record_cache", RecordCache())
+            projected = await server.fetch_record(server.RecordInput(
+                record_type="customer", record_id="123456", fields=["companyName", "email"]))
+            assert projected == {"companyName": "Acme Corp", "email": "contact@acme.com"}
+            assert stub.requests[-1]["params"] == {"fields": "companyName,email"}
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_field_projection_on_fetch_record_and_suiteql():
+    async def run():
+        record = await server.fetch_record(server.RecordInput(
+            record_type="customer", record_id="123456", fields=["id", "companyName"]))
+        assert record == {"id": "123456", "companyName": "Acme Corp"}
+
+        page = await server.execute_suiteql(server.ExecuteSuiteQLInput(
+            query="SELECT * FROM customer WHERE id = '123456'", fields=["companyName", "email"]))
+        assert [sorted(row) for row in page["items"]] == [["companyName", "email"]]
+        assert page["items"][0]["companyName"] == "Acme Corp"
+
+    asyncio.run(run())
+    assert server.select_fields("select *  from customer c", ["id", "email"]) == "SELECT id, email FROM customer c"
+    assert server.select_fields("SELECT id FROM customer", ["id"]) == "SELECT id FROM customer"
+    # NetSuite returns SuiteQL columns in lower case.
+    assert server.project_rows([{"companyname": "Acme", "id": "1"}], ["companyName"]) == [{"companyName": "Acme"}]
+    # Each row is matched on its own keys; NetSuite leaves out empty columns.
+    rows = [{"id": "1"}, {"id": "2", "companyname": "X"}, {"id": "3", "companyName": "Y"}]
+    assert server.project_rows(rows, ["companyName", "ID"]) == [
+        {"companyName": None, "ID": "1"}, {"companyName": "X", "ID": "2"}, {"companyName": "Y", "ID": "3"}]
+
+
+def test_large_pages_pass_through_or_encode_like_the_default_encoder():
+    page = {"items": [{"id": str(n), "companyName": f"Customer {n}", "email": f"c{n}@example.com",
+                       "balance": n * 1.5, "subsidiary": {"id": "1"}} for n in range(1000)], "totalResults": 1000}
+    upstream = json.dumps(page).encode()
+    # Undecoded upstream bytes are forwarded as they arrived.
+    assert server.to_content(RawJSON(upstream))[0].text == upstream.decode()
+    # Decoded results carry the same JSON as FastMCP's default (indented) encoding.
+    default = pydantic_core.to_json(page, fallback=str, indent=2)
+    assert json.loads(server.to_content(json.loads(upstream))[0].text) == json.loads(default) == page
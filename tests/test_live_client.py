@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from netsuite_client import NetSuiteClient
+from netsuite_stub import NetSuiteStub
+
+
+def test_pooled_client_reuses_connections(live_env):
+    async def run():
+        async with NetSuiteStub() as stub:
+            client = NetSuiteClient(stub.base_url, max_connections=2)
+            await client.start()
+            for _ in range(20):
+                data = await client.get("/services/rest/record/v1/customer/123456")
+                assert data["companyName"] == "Acme Corp"
+            await asyncio.gather(*(client.get("/services/rest/record/v1/invoice/456789", params={"n": n}) for n in range(20)))
+            await client.close()
+            assert len(stub.requests) == 40
+            assert stub.connections <= 2
+            assert stub.requests[0]["headers"]["authorization"] == "Bearer token"
+
+    asyncio.run(run())
+
+
+def test_suiteql_paging_and_writes(live_env):
+    async def run():
+        async with NetSuiteStub() as stub:
+            client = NetSuiteClient(stub.base_url)
+            page = await client.post("/services/rest/query/v1/suiteql", {"q": "SELECT id FROM customer", "limit": 1, "offset": 1})
+            assert page["items"] == stub.suiteql_rows[1:2]
+            request = stub.requests[-1]
+            assert request["params"] == {"limit": "1", "offset": "1"}
+            assert request["body"] == {"q": "SELECT id FROM customer"}
+            assert request["headers"]["prefer"] == "transient"
+
+            created = await client.post("/services/rest/record/v1/customer", {"companyName": "New Co"})
+            assert created["status"] == "created" and created["id"]
+            updated = await client.patch("/services/rest/record/v1/customer/123456", {"email": "x@acme.com"})
+            assert updated == {"id": "123456", "status": "updated"}
+            with pytest.raises(ValueError, match="does not exist"):
+                await client.get("/services/rest/record/v1/customer/1")
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_live_mode_requires_account(monkeypatch):
+    monkeypatch.setenv("NETSUITE_MOCK", "false")
+    monkeypatch.delenv("NETSUITE_BASE_URL", raising=False)
+    monkeypatch.delenv("NETSUITE_ACCOUNT_ID", raising=False)
+    with pytest.raises(ValueError):
+        NetSuiteClient()
+
+
+def test_concurrent_identical_reads_are_coalesced(live_env):
+    async def run():
+        async with NetSuiteStub(latency=0.05) as stub:
+            client = NetSuiteClient(stub.base_url)
+            query = {"q": "SELECT id FROM customer", "limit": 10, "offset": 0}
+            results = await asyncio.gather(
+                *(client.get("/services/rest/record/v1/customer/123456") for _ in range(10)),
+                *(client.post("/services/rest/query/v1/suiteql", dict(reversed(query.items()))) for _ in range(10)),
+                client.post("/services/rest/query/v1/suiteql", {**query, "offset": 1}),
+            )
+            assert all(result is results[0] for result in results[:10])
+            assert len(stub.requests) == 3
+            assert client.singleflight.stats() == {"calls": 3, "coalesced": 18, "in_flight": 0}
+
+            # Writes are never coalesced.
+            await asyncio.gather(*(client.patch("/services/rest/record/v1/customer/123456", {"email": "a@b.c"}) for _ in range(3)))
+            assert len(stub.requests) == 6
+            await client.close()
+
+    asyncio.run(run())
@@ -0,0 +1,83 @@
+import logging
+import os
+import queue
+import subprocess
+import sys
+
+from logger import LazyQueueHandler, SAMPLED, SamplingFilter, TruncatingFormatter
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+def _record(message: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_formatter_truncates_long_messages():
+    formatter = TruncatingFormatter("%(message)s", max_length=10)
+    assert formatter.format(_record("%s", "x" * 25)) == "x" * 10 + "... (15 chars truncated)"
+    assert formatter.format(_record("short")) == "short"
+
+
+def test_sampling_filter_only_drops_marked_info_records():
+    sampler = SamplingFilter(rate=0.0)
+    assert not sampler.filter(_record("GET request", **SAMPLED))
+    assert sampler.filter(_record("Loaded mock data"))
+    error = _record("failed", **SAMPLED)
+    error.levelno = logging.ERROR
+    assert sampler.filter(error)
+    assert SamplingFilter(rate=1.0).filter(_record("GET request", **SAMPLED))
+
+
+def test_log_calls_defer_formatting_to_listener():
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "expensive"
+
+    records = []
+    handler = LazyQueueHandler(type("Q", (), {"put_nowait": staticmethod(records.append)})())
+    log = logging.getLogger("test_logging.lazy")
+    log.addHandler(handler)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.info("value: %s", Expensive())
+    log.debug("never formatted: %s", Expensive())
+    assert Expensive.formatted == 0 and len(records) == 1
+    assert TruncatingFormatter("%(message)s").format(records[0]) == "value: expensive"
+
+
+def test_httpx_request_lines_are_queued_not_written_inline():
+    # httpx logs every request at INFO; the root logger's handler would write it synchronously.
+    httpx_logger = logging.getLogger("httpx")
+    assert any(isinstance(handler, LazyQueueHandler) for handler in httpx_logger.handlers)
+    assert not httpx_logger.propagate
+
+
+def test_server_keeps_stdout_clean():
+    # In stdio transport anything on stdout corrupts the protocol stream.
+    code = ("import asyncio, server; "
+            "asyncio.run(server.fetch_customer(server.CustomerInput(customer_id='123456'))); "
+            "asyncio.run(server.mcp.list_tools())")
+    result = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True,
+                            env={**os.environ, "NETSUITE_MOCK": "true"}, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ""
+    assert "Calling fetch_customer" in result.stderr
+
+
+def test_prepare_defers_formatting_but_snapshots_mutable_args():
+    handler = LazyQueueHandler(queue.SimpleQueue())
+    record = _record("GET %s in %.1f ms", "record/v1/customer", 1.25)
+    assert handler.prepare(record) is record
+    assert record.args == ("record/v1/customer", 1.25) and not hasattr(record, "message")
+
+    items = [1, 2]
+    record = handler.prepare(_record("items: %s", items))
+    items.append(3)
+    assert record.args is None
+    assert TruncatingFormatter("%(message)s").format(record) == "items: [1, 2]"
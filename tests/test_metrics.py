@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from metrics import Metrics, serve_prometheus
+
+SERVER = os.path.join(os.path.dirname(__file__), "..", "src", "server.py")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_histogram_summary_and_prometheus_text():
+    registry = Metrics()
+    for value in (0.002, 0.004, 0.03, 0.2):
+        registry.observe("mcp_tool_seconds", value, tool="fetch_customer", phase="total")
+    registry.inc("mcp_tool_calls_total", tool="fetch_customer", status="ok")
+    registry.add_collector(lambda: [("netsuite_cache_hits_total", {"cache": "record"}, 3)])
+
+    summary = registry.snapshot()["histograms"]["mcp_tool_seconds"][0]
+    assert summary["count"] == 4 and summary["p50"] == 0.005 and summary["p99"] == 0.25
+    text = registry.render_prometheus()
+    assert 'mcp_tool_seconds_bucket{phase="total",tool="fetch_customer",le="0.005"} 2' in text
+    assert 'mcp_tool_seconds_bucket{phase="total",tool="fetch_customer",le="+Inf"} 4' in text
+    assert 'mcp_tool_calls_total{status="ok",tool="fetch_customer"} 1' in text
+    assert 'netsuite_cache_hits_total{cache="record"} 3' in text
+
+
+def test_prometheus_endpoint_binds_to_loopback_by_default():
+    async def run():
+        server = await serve_prometheus(0)
+        assert [sock.getsockname()[0] for sock in server.sockets] == ["127.0.0.1"]
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_server_stats_over_mcp_session():
+    port = _free_port()
+
+    async def run():
+        params = StdioServerParameters(
+            command=sys.executable,
+            args=[SERVER],
+            env={"MCP_API_KEY": "default_key", "NETSUITE_METRICS_PORT": str(port),
+                 "NETSUITE_SCHEMA_CACHE": os.environ["NETSUITE_SCHEMA_CACHE"]},
+        )
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                for _ in range(3):
+                    await session.call_tool("fetch_customer", {"input": {"customer_id": "123456"}})
+                error = await session.call_tool("fetch_record", {"input": {"record_type": "widget", "record_id": "1"}})
+                assert error.isError and "Invalid record type" in error.content[0].text
+
+                result = await session.call_tool("get_server_stats", {})
+                stats = json.loads(result.content[0].text)
+                phases = {entry["phase"]: entry for entry in stats["metrics"]["histograms"]["mcp_tool_seconds"]
+                          if entry["tool"] == "fetch_customer"}
+                assert set(phases) == {"validation", "upstream", "handler", "serialization", "total"}
+                assert phases["total"]["count"] == 3
+                calls = {(entry["tool"], entry["status"]): entry["value"]
+                         for entry in stats["metrics"]["counters"]["mcp_tool_calls_total"]}
+                assert calls[("fetch_customer", "ok")] == 3 and calls[("fetch_record", "error")] == 1
+                assert stats["caches"]["record"]["hits"] == 2
+
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(f"http://127.0.0.1:{port}/metrics")
+                assert response.status_code == 200
+                assert 'mcp_tool_calls_total{status="ok",tool="fetch_customer"} 3' in response.text
+                assert 'netsuite_cache_hits_total{cache="record"} 2' in response.text
+
+    asyncio.run(run())
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+
+import mock_backend
+from conftest import MOCK_FILE
+from mock_backend import MockBackend, compile_query, generate_dataset
+
+
+@pytest.fixture
+def backend():
+    with open(MOCK_FILE) as f:
+        backend = MockBackend.from_fixture(json.load(f))
+    for name, email, balance, state in [("Beta Inc", "info@beta.com", 250.0, "NY"),
+                                        ("Gamma LLC", None, 75.25, "CA"),
+                                        ("acme labs", "labs@acme.com", 5000.0, "TX")]:
+        backend.post("record/v1/customer", {"companyName": name, "email": email, "balance": balance,
+                                            "billState": state, "subsidiary": {"id": "2"}})
+    return backend
+
+
+def test_writes_persist_and_read_back(backend):
+    created = backend.post("record/v1/customer", {"companyName": "New Co", "subsidiary": {"id": "1"}})
+    assert created["status"] == "created" and created["id"] == "123460"
+    assert backend.get(f"record/v1/customer/{created['id']}")["subsidiary"] == {"id": "1"}
+
+    backend.patch(f"record/v1/customer/{created['id']}", {"email": "hello@new.co"})
+    record = backend.get(f"record/v1/customer/{created['id']}")
+    assert record["email"] == "hello@new.co" and record["companyName"] == "New Co"
+
+    record["companyName"] = "mutated by caller"
+    assert backend.get(f"record/v1/customer/{created['id']}")["companyName"] == "New Co"
+    with pytest.raises(ValueError, match="does not exist"):
+        backend.patch("record/v1/customer/1", {"email": "x@y.z"})
+    assert backend.get("record/v1/metadata-catalog")["records"]
+
+
+def test_suiteql_where_like_order_limit(backend):
+    page = backend.suiteql("SELECT id, companyName FROM customer WHERE companyName LIKE '%acme%' ORDER BY id")
+    assert [row["companyName"] for row in page["items"]] == ["Acme Corp", "acme labs"]
+
+    page = backend.suiteql("SELECT id, balance FROM customer WHERE billState = 'CA' AND balance > 100")
+    assert page["items"] == [{"id": "123456", "balance": 1000.5}]
+
+    page = backend.suiteql("SELECT companyName FROM customer WHERE email IS NULL OR subsidiary = 1")
+    assert [row["companyName"] for row in page["items"]] == ["Acme Corp", "Gamma LLC"]
+
+    query = "SELECT c.id, c.balance AS amount FROM customer c ORDER BY balance DESC FETCH FIRST 3 ROWS ONLY"
+    first = backend.suiteql(query, limit=2, offset=0)
+    second = backend.suiteql(query, limit=2, offset=2)
+    assert [row["amount"] for row in first["items"] + second["items"]] == [5000.0, 1000.5, 250.0]
+    assert first["totalResults"] == 3 and first["hasMore"] and not second["hasMore"]
+
+    page = backend.suiteql("SELECT id, entity, type FROM transaction WHERE type = 'SalesOrd'")
+    assert page["items"] == [{"id": "987654", "entity": "123456", "type": "SalesOrd"}]
+
+
+def test_unsupported_suiteql_falls_back_to_canned_payload(backend):
+    assert compile_query("SELECT COUNT(*) FROM customer") is None
+    assert compile_query("SELECT id FROM customer c JOIN transaction t ON t.entity = c.id") is None
+    page = backend.post("query/v1/suiteql", {"q": "SELECT COUNT(*) FROM customer", "limit": 10, "offset": 0})
+    assert page["items"][1]["companyName"] == "Beta Inc"
+
+
+def test_indexes_follow_writes_at_scale(monkeypatch):
+    backend = MockBackend()
+    generate_dataset(backend, 100_000, orders=50_000, invoices=20_000)
+    assert backend.stats() == {"customer": 100_000, "salesOrder": 50_000, "invoice": 20_000}
+
+    query = "SELECT id FROM customer WHERE email = 'contact4242@example.com'"
+    assert backend.suiteql(query)["items"] == [{"id": "4243"}]
+    # Count rows tested by a predicate, i.e. scanned rather than found through an index.
+    scanned = []
+    predicate = mock_backend._predicate
+
+    def counting_predicate(condition):
+        test = predicate(condition)
+
+        def counted(value):
+            scanned.append(value)
+            return test(value)
+
+        return counted
+
+    monkeypatch.setattr(mock_backend, "_predicate", counting_predicate)
+    for n in range(1000):
+        page = backend.suiteql(f"SELECT id FROM customer WHERE email = 'contact{n}@example.com'")
+        assert page["items"] == [{"id": str(n + 1)}]
+    assert scanned == []
+    backend.suiteql("SELECT id FROM customer WHERE balance > 49000")
+    assert len(scanned) == 100_000  # a range condition without an equality index does scan
+
+    top = "SELECT id, balance FROM customer ORDER BY balance DESC LIMIT 1"
+    assert backend.suiteql(top)["items"][0]["balance"] <= 50000
+    backend.patch("record/v1/customer/17", {"balance": 99999.0, "email": "moved@example.com"})
+    assert backend.suiteql(top)["items"] == [{"id": "17", "balance": 99999.0}]
+    assert backend.suiteql("SELECT id FROM customer WHERE email = 'contact16@example.com'")["items"] == []
+    assert backend.suiteql("SELECT id FROM customer WHERE email = 'moved@example.com'")["items"] == [{"id": "17"}]
+
+    orders = backend.suiteql("SELECT id, entity FROM salesOrder WHERE entity = '17'")
+    assert all(row["entity"] == "17" for row in orders["items"])
+
+
+def test_server_tools_read_back_mock_writes():
+    import server
+
+    async def run():
+        created = await server.create_customer(server.CreateCustomerInput(
+            company_name="Readback Ltd", email="rb@example.com", subsidiary="1"))
+        fetched = await server.fetch_customer(server.CustomerInput(customer_id=created["id"]))
+        assert fetched["companyName"] == "Readback Ltd"
+
+        await server.update_record(server.UpdateRecordInput(
+            record_type="customer", record_id=created["id"], payload={"email": "new@example.com"}))
+        fetched = await server.fetch_customer(server.CustomerInput(customer_id=created["id"]))
+        assert fetched["email"] == "new@example.com"
+
+        found = await server.search_customers(server.SearchCustomersInput(query="readback"))
+        assert [row["id"] for row in found["items"]] == [created["id"]]
+
+    asyncio.run(run())
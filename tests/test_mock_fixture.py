@@ -0,0 +1,43 @@
+import math
+
+from conftest import MOCK_FILE
+from mock_backend import MockBackend, generate_dataset
+from mock_fixture import BinaryFixture, main, write_fixture
+
+
+def test_converted_fixture_loads_lazily(tmp_path):
+    target = str(tmp_path / "netsuite.nsmock")
+    main([MOCK_FILE, target])
+
+    backend = MockBackend.open(target)
+    assert backend.stats() == {}
+    assert backend.get("record/v1/customer/123456")["companyName"] == "Acme Corp"
+    assert backend.get("record/v1/metadata-catalog")["records"]
+    assert backend.stats() == {"customer": 1}
+
+    created = backend.post("record/v1/salesOrder", {"entity": {"id": "123456"}})
+    assert created["id"] == "987655"
+    backend.patch("record/v1/salesOrder/987654", {"status": "approved"})
+    page = backend.suiteql("SELECT id, status FROM salesOrder ORDER BY id")
+    assert page["items"] == [{"id": "987654", "status": "approved"}, {"id": "987655", "status": None}]
+    assert backend.get("record/v1/invoice/1") is None
+
+
+def test_open_and_lookup_cost_is_logarithmic(tmp_path):
+    for customers in (100, 200_000):
+        source = MockBackend()
+        generate_dataset(source, customers, orders=0, invoices=0)
+        path = str(tmp_path / f"{customers}.nsmock")
+        write_fixture(source, path)
+
+        backend = MockBackend.open(path)
+        assert backend.fixture.decoded == 0
+        record = backend.get(f"record/v1/customer/{customers // 2}")
+        assert record["email"] == f"contact{customers // 2 - 1}@example.com"
+        assert backend.fixture.count("customer") == customers
+        # Opening decodes nothing; a lookup binary-searches the id table and decodes one record.
+        assert backend.fixture.decoded == 1
+        assert backend.fixture.probes <= math.ceil(math.log2(customers + 1))
+        backend.fixture.close()
+
+    assert BinaryFixture.is_binary(path) and not BinaryFixture.is_binary(MOCK_FILE)
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+from netsuite_client import NetSuiteClient
+from netsuite_stub import NetSuiteStub, _error
+from scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, RequestScheduler, ThrottledError
+
+
+async def _fetch_all(stub, scheduler, count=60):
+    client = NetSuiteClient(stub.base_url, scheduler=scheduler)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        client.get("/services/rest/record/v1/customer/123456", params={"n": n}) for n in range(count)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return results, elapsed
+
+
+def test_throttled_reads_are_retried_until_they_succeed(live_env):
+    async def run():
+        async with NetSuiteStub(latency=0.02, max_concurrency=2) as stub:
+            eager = RequestScheduler(concurrency=6, rate=1000, base_delay=0.01, max_retries=10)
+            results, eager_time = await _fetch_all(stub, eager)
+            assert all(result["id"] == "123456" for result in results)
+            assert stub.throttled > 0 and eager.stats()["retries"] == stub.throttled
+            assert eager.bucket.rate < 1000
+
+        async with NetSuiteStub(latency=0.02, max_concurrency=2) as stub:
+            matched = RequestScheduler(concurrency=2, rate=1000)
+            results, matched_time = await _fetch_all(stub, matched)
+            assert stub.throttled == 0 and len(results) == 60
+        print(f"\n60 reads, account limit 2: concurrency 6 with retries {60 / eager_time:.0f} req/s, "
+              f"concurrency 2 {60 / matched_time:.0f} req/s")
+
+    asyncio.run(run())
+
+
+def test_throttling_is_read_from_error_codes_not_payloads(live_env):
+    class ThrottlingStub(NetSuiteStub):
+        def respond(self, request):
+            if len(self.requests) == 1:
+                return 400, _error(400, "Too many concurrent requests", "CONCURRENCY_LIMIT_EXCEEDED"), {}
+            return super().respond(request)
+
+    async def run():
+        memo = {"id": "123456", "memo": "Retry on CONCURRENCY_LIMIT_EXCEEDED"}
+        async with NetSuiteStub(records={"record/v1/customer/123456": memo}, suiteql_rows=[]) as stub:
+            client = NetSuiteClient(stub.base_url, scheduler=RequestScheduler(rate=1000, base_delay=0.01))
+            assert await client.get("/services/rest/record/v1/customer/123456") == memo
+            assert len(stub.requests) == 1
+            await client.close()
+
+        async with ThrottlingStub(records={"record/v1/customer/123456": memo}, suiteql_rows=[]) as stub:
+            scheduler = RequestScheduler(rate=1000, base_delay=0.01)
+            client = NetSuiteClient(stub.base_url, scheduler=scheduler)
+            assert await client.get("/services/rest/record/v1/customer/123456") == memo
+            assert len(stub.requests) == 2 and scheduler.stats()["retries"] == 1
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_writes_are_not_retried(live_env):
+    async def run():
+        async with NetSuiteStub(latency=0.02, max_concurrency=1) as stub:
+            client = NetSuiteClient(stub.base_url, scheduler=RequestScheduler(concurrency=4, rate=1000, base_delay=0.01))
+            results = await asyncio.gather(*(
+                client.patch("/services/rest/record/v1/customer/123456", {"n": n}) for n in range(4)), return_exceptions=True)
+            assert any(isinstance(result, ThrottledError) for result in results)
+            assert len(stub.requests) == 4
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_retry_after_is_capped_at_max_delay(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    responses = [ThrottledError("throttled", retry_after=3600), ThrottledError("throttled", retry_after=0.25), "ok"]
+
+    async def send():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    scheduler = RequestScheduler(max_delay=2.0)
+    assert asyncio.run(scheduler.run(send)) == "ok"
+    assert delays == [2.0, 0.25]
+
+
+def test_interactive_requests_jump_ahead_of_bulk():
+    async def run():
+        scheduler = RequestScheduler(concurrency=1, rate=1000)
+        order = []
+        gate = asyncio.Event()
+
+        async def send(name):
+            if name == "first":
+                await gate.wait()
+            order.append(name)
+
+        tasks = [asyncio.create_task(scheduler.run(lambda: send("first"), priority=PRIORITY_BULK))]
+        await asyncio.sleep(0)
+        for n in range(3):
+            tasks.append(asyncio.create_task(scheduler.run(lambda n=n: send(f"bulk{n}"), priority=PRIORITY_BULK)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(scheduler.run(lambda: send("interactive"), priority=PRIORITY_INTERACTIVE)))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 4
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order == ["first", "interactive", "bulk0", "bulk1", "bulk2"]
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from schema_cache import SchemaCache
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+SERVER = os.path.join(SRC, "server.py")
+
+# Counts pydantic schema generation during import, then lists the tools and calls one.
+PROBE = """
+import asyncio, json, pydantic
+generate = pydantic.BaseModel.model_json_schema.__func__
+generated = []
+def counting(cls, *args, **kwargs):
+    generated.append(cls.__name__)
+    return generate(cls, *args, **kwargs)
+pydantic.BaseModel.model_json_schema = classmethod(counting)
+import server
+imported = len(generated)
+tools = asyncio.run(server.mcp.list_tools())
+fetched = asyncio.run(server.mcp.call_tool("fetch_customer", {"input": {"customer_id": "123456"}}))
+print(json.dumps({"generated": imported, "tools": [tool.model_dump() for tool in tools],
+                  "fetched": fetched[0].text}))
+"""
+
+
+def _env(cache_dir) -> dict:
+    return {**os.environ, "MCP_API_KEY": "default_key", "NETSUITE_MOCK": "true",
+            "NETSUITE_LOG_LEVEL": "WARNING", "NETSUITE_SCHEMA_CACHE": str(cache_dir)}
+
+
+def _probe(cache_dir) -> dict:
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=SRC, env=_env(cache_dir),
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+def test_warm_schema_cache_skips_schema_generation(tmp_path):
+    cold = _probe(tmp_path)
+    assert cold["generated"] > 0
+    assert [path.name for path in tmp_path.iterdir()][0].startswith("tool-schemas-")
+
+    warm = _probe(tmp_path)
+    assert warm["generated"] == 0
+    assert warm["tools"] == cold["tools"]
+    assert "Acme Corp" in warm["fetched"]
+
+
+def test_saving_a_new_version_deletes_older_schema_files(tmp_path):
+    (tmp_path / "tool-schemas-0123456789abcdef.json").write_text("{}")
+    (tmp_path / "notes.json").write_text("{}")
+    cache = SchemaCache(str(tmp_path), "fedcba9876543210")
+    cache.put("tool:fetch_customer", {"type": "object"})
+    cache.save()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["notes.json", "tool-schemas-fedcba9876543210.json"]
+
+
+async def _first_list_tools(cache_dir) -> float:
+    started = time.perf_counter()
+    params = StdioServerParameters(command=sys.executable, args=[SERVER], env=_env(cache_dir))
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            tools = await session.list_tools()
+            elapsed = time.perf_counter() - started
+    assert "fetch_customer" in [tool.name for tool in tools.tools]
+    return elapsed
+
+
+def test_time_to_first_list_tools(tmp_path):
+    cold = asyncio.run(_first_list_tools(tmp_path))
+    [cache_file] = tmp_path.iterdir()
+    written = cache_file.stat().st_mtime_ns
+    warm = min(asyncio.run(_first_list_tools(tmp_path)) for _ in range(3))
+    print(f"time to first list_tools: cold schema cache {cold * 1000:.0f} ms, warm {warm * 1000:.0f} ms")
+    # Warm servers find every schema in the cache, so they have nothing new to write.
+    assert cache_file.stat().st_mtime_ns == written
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from cache import QueryResultCache
+from netsuite_client import NetSuiteClient
+from netsuite_stub import NetSuiteStub
+from suiteql import fetch_suiteql_parallel, iter_suiteql, iter_suiteql_pages, parse_query
+
+ROWS = [{"id": str(n), "companyName": f"Customer {n}"} for n in range(2500)]
+
+
+def test_parse_query_normalizes_layout_and_memoizes():
+    parse_query.cache_clear()
+    first = parse_query("select id,companyName from Customer c JOIN transaction t ON t.entity = c.id WHERE t.total > 1.50")
+    second = parse_query("SELECT  id , companyName\nFROM Customer c -- comment\njoin transaction t on t.entity=c.id where t.total > 1.5")
+    assert first.normalized == second.normalized
+    assert first.statement_type == "SELECT"
+    assert first.tables == frozenset({"customer", "transaction"})
+    assert parse_query("SELECT id FROM customer WHERE name = 'A  b'").normalized.endswith("'A  b'")
+    parse_query("select id,companyName from Customer c JOIN transaction t ON t.entity = c.id WHERE t.total > 1.50")
+    assert parse_query.cache_info().hits == 1
+
+
+def test_parse_query_finds_comma_joined_and_subquery_tables():
+    tables = lambda query: parse_query(query).tables
+    assert tables("SELECT c.id FROM customer c, transaction t WHERE t.entity = c.id") == {"customer", "transaction"}
+    assert tables("SELECT * FROM customer AS c, transaction AS t, item") == {"customer", "transaction", "item"}
+    assert tables("SELECT id FROM customer c JOIN transaction t ON t.entity = c.id, item i") == {"customer", "transaction", "item"}
+    assert tables("SELECT x.id FROM (SELECT id FROM transaction) x, customer c") == {"customer", "transaction"}
+    assert tables("SELECT id FROM customer WHERE id IN (SELECT entity FROM transaction)") == {"customer", "transaction"}
+    assert tables("SELECT a, b FROM customer WHERE a IN (1, 2) ORDER BY a, b") == {"customer"}
+
+    cache = QueryResultCache(default_ttl=60, table_ttls={"transaction": 5})
+    query = parse_query("SELECT c.id FROM customer c, transaction t WHERE t.entity = c.id")
+    assert cache.ttl_for(query.tables) == 5
+    cache.put((query.normalized,), query.tables, {"items": []})
+    cache.invalidate_table("transaction")
+    assert cache.get((query.normalized,)) is None
+    # Nothing would invalidate a result whose tables are unknown, so it is not cached.
+    cache.put(("unknown",), frozenset(), {"items": []})
+    assert cache.get(("unknown",)) is None
+
+
+def test_iter_suiteql_follows_has_more(live_env):
+    async def run():
+        async with NetSuiteStub(suiteql_rows=ROWS) as stub:
+            client = NetSuiteClient(stub.base_url)
+            rows = [row async for row in iter_suiteql(client, "SELECT id FROM customer", page_size=1000)]
+            assert rows == ROWS
+            assert [r["params"]["offset"] for r in stub.requests] == ["0", "1000", "2000"]
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_iter_suiteql_pages_prefetches_and_bounds_rows(live_env):
+    async def run():
+        async with NetSuiteStub(suiteql_rows=ROWS, latency=0.05) as stub:
+            client = NetSuiteClient(stub.base_url)
+            pages = iter_suiteql_pages(client, "SELECT id FROM customer", page_size=500, max_rows=1200)
+            first = await anext(pages)
+            # The second page is already on the wire while the first is consumed.
+            await asyncio.sleep(0.01)
+            assert len(stub.requests) == 2
+            rest = [page async for page in pages]
+            items = first["items"] + [row for page in rest for row in page["items"]]
+            assert items == ROWS[:1200]
+            assert rest[-1]["nextOffset"] == 1200
+            assert len(stub.requests) == 3
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_execute_suiteql_paginated_reports_progress(monkeypatch):
+    import server
+    monkeypatch.setenv("NETSUITE_MOCK", "false")
+
+    class Progress:
+        def __init__(self):
+            self.calls = []
+
+        async def report_progress(self, progress, total=None):
+            self.calls.append((progress, total))
+
+    async def run():
+        async with NetSuiteStub(suiteql_rows=ROWS) as stub:
+            monkeypatch.setattr(server, "ns_client", NetSuiteClient(stub.base_url))
+            ctx = Progress()
+            result = await server.execute_suiteql(
+                server.ExecuteSuiteQLInput(query="SELECT id FROM customer", limit=1000, paginate=True, max_rows=2000), ctx)
+            assert len(result["items"]) == 2000
+            assert result["hasMore"] is True and result["nextOffset"] == 2000
+            assert ctx.calls == [(1000, 2000), (2000, 2000)]
+            # A paginated call buffers its rows, so it is bounded; larger reads go on from nextOffset.
+            with pytest.raises(ValidationError):
+                server.ExecuteSuiteQLInput(query="SELECT id FROM customer", paginate=True,
+                                           max_rows=server.MAX_PAGINATED_ROWS + 1)
+            await server.ns_client.close()
+
+    asyncio.run(run())
+
+
+def test_parallel_fanout_reassembles_pages_in_order(live_env):
+    async def run():
+        async with NetSuiteStub(suiteql_rows=ROWS, latency=0.01) as stub:
+            client = NetSuiteClient(stub.base_url)
+            progress = []
+
+            async def on_page(read, expected):
+                progress.append((read, expected))
+
+            result = await fetch_suiteql_parallel(client, "SELECT id FROM customer ORDER BY id", page_size=300,
+                                                  offset=300, max_rows=2000, concurrency=4, on_page=on_page)
+            assert result["items"] == ROWS[300:2300]
+            assert result["hasMore"] is True and result["nextOffset"] == 2300
+            assert progress[-1] == (2000, 2000)
+            assert sorted(int(r["params"]["offset"]) for r in stub.requests) == list(range(300, 2400, 300))
+            await client.close()
+
+    asyncio.run(run())
+
+
+class GatedClient:
+    """Serves SuiteQL pages, holding later pages until ``width`` requests are in flight."""
+
+    def __init__(self, rows, width):
+        self.rows = rows
+        self.width = width
+        self.active = 0
+        self.peak = 0
+        self.full = asyncio.Event()
+
+    async def post(self, path, data):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if data["offset"]:
+                if self.active >= self.width:
+                    self.full.set()
+                await asyncio.wait_for(self.full.wait(), 5)
+            items = self.rows[data["offset"]:data["offset"] + data["limit"]]
+            return {"items": items, "totalResults": len(self.rows),
+                    "hasMore": data["offset"] + len(items) < len(self.rows)}
+        finally:
+            self.active -= 1
+
+
+def test_parallel_fanout_keeps_concurrency_pages_in_flight():
+    rows = [{"id": str(n)} for n in range(2000)]
+
+    async def run():
+        client = GatedClient(rows, width=5)
+        result = await fetch_suiteql_parallel(client, "SELECT id FROM customer", page_size=100,
+                                              max_rows=len(rows), concurrency=5)
+        assert result["items"] == rows
+        # Pages are only released once five are in flight, and never more than five are.
+        assert client.peak == 5
+
+    asyncio.run(run())
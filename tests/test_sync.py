@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import mock_backend
+import server
+from cache import QueryResultCache, RecordCache
+from conftest import MOCK_FILE
+from mock_backend import MockBackend
+from netsuite_client import NetSuiteClient
+from netsuite_stub import NetSuiteStub
+
+
+def test_sync_records_returns_only_changes_and_refreshes_cache(monkeypatch):
+    with open(MOCK_FILE) as f:
+        backend = MockBackend.from_fixture(json.load(f))
+    clock = ["2025-02-01T00:00:00Z"]
+    monkeypatch.setattr(mock_backend, "now_iso", lambda: clock[0])
+    monkeypatch.setattr(server.ns_client, "mock", backend)
+    monkeypatch.setattr(server, "record_cache", RecordCache())
+    monkeypatch.setattr(server, "query_cache", QueryResultCache())
+    monkeypatch.setattr(server, "sync_watermarks", {})
+    created = [backend.post("record/v1/customer", {"companyName": f"Sync {n}"})["id"] for n in range(3)]
+
+    def sync(**kwargs):
+        return asyncio.run(server.sync_records(server.SyncRecordsInput(record_type="customer", **kwargs)))
+
+    first = sync()
+    assert [record["id"] for record in first["changes"]] == ["123456"] + created
+    assert first["watermark"] == "2025-02-01T00:00:00Z" and not first["hasMore"]
+    assert server.record_cache.get("customer", created[0])["companyName"] == "Sync 0"
+
+    assert sync()["changes"] == []
+
+    clock[0] = "2025-03-01T00:00:00Z"
+    backend.patch(f"record/v1/customer/{created[1]}", {"email": "changed@example.com"})
+    delta = sync()
+    assert [record["email"] for record in delta["changes"]] == ["changed@example.com"]
+    assert delta["since"] == "2025-02-01T00:00:00Z" and delta["watermark"] == "2025-03-01T00:00:00Z"
+    assert server.record_cache.get("customer", created[1])["email"] == "changed@example.com"
+
+    # Other cursors keep their own watermark; an explicit since overrides it without moving it.
+    assert sync(cursor="reporting")["count"] == 4
+    assert sync(since="2025-01-15T00:00:00Z")["count"] == 3
+    assert sync(cursor="backfill", since="2025-01-15T00:00:00Z")["count"] == 3
+    assert ("customer", "backfill") not in server.sync_watermarks
+    assert server.sync_watermarks[("customer", "default")][0] == "2025-03-01T00:00:00Z"
+
+    orders = asyncio.run(server.sync_records(server.SyncRecordsInput(record_type="salesOrder")))
+    assert [record["id"] for record in orders["changes"]] == ["987654"]
+
+
+def test_sync_records_delivers_late_changes_within_the_watermark_second(monkeypatch):
+    with open(MOCK_FILE) as f:
+        backend = MockBackend.from_fixture(json.load(f))
+    monkeypatch.setattr(mock_backend, "now_iso", lambda: "2025-02-01T00:00:00Z")
+    monkeypatch.setattr(server.ns_client, "mock", backend)
+    monkeypatch.setattr(server, "record_cache", RecordCache())
+    monkeypatch.setattr(server, "query_cache", QueryResultCache())
+    monkeypatch.setattr(server, "sync_watermarks", {})
+    created = [backend.post("record/v1/customer", {"companyName": f"Sync {n}"})["id"] for n in range(3)]
+
+    def sync(**kwargs):
+        result = asyncio.run(server.sync_records(server.SyncRecordsInput(record_type="customer", **kwargs)))
+        return [record["id"] for record in result["changes"]], result["hasMore"]
+
+    # max_rows cuts the sync inside one second; the rest of that second still follows.
+    assert sync(max_rows=2) == (["123456", created[0]], True)
+    assert sync(max_rows=2) == (created[1:], False)
+    # Committed late, but stamped with the second that was already synced.
+    late = backend.post("record/v1/customer", {"companyName": "Late"})["id"]
+    assert sync() == ([late], False)
+    assert sync() == ([], False)
+
+
+def test_sync_records_advances_on_live_lower_case_columns(live_env, monkeypatch):
+    with open(MOCK_FILE) as f:
+        records = json.load(f)
+    ids = ["123456", "200", "201"]
+    for record_id in ids[1:]:
+        records[f"record/v1/customer/{record_id}"] = {"id": record_id, "companyName": f"Live {record_id}"}
+    # NetSuite lower-cases SuiteQL column names. The stub ignores WHERE, so nothing is filtered upstream.
+    rows = [{"id": record_id, "lastmodifieddate": "2025-02-01T00:00:00Z"} for record_id in ids]
+
+    async def run():
+        async with NetSuiteStub(records=records, suiteql_rows=rows) as stub:
+            monkeypatch.setattr(server, "ns_client", NetSuiteClient(stub.base_url))
+            monkeypatch.setattr(server, "record_cache", RecordCache())
+            monkeypatch.setattr(server, "query_cache", QueryResultCache())
+            monkeypatch.setattr(server, "sync_watermarks", {})
+            sync = lambda: server.sync_records(server.SyncRecordsInput(record_type="customer"))
+            first = await sync()
+            assert [record["id"] for record in first["changes"]] == ids
+            assert first["watermark"] == "2025-02-01T00:00:00Z"
+            assert server.sync_watermarks[("customer", "default")] == ("2025-02-01T00:00:00Z", set(ids))
+            again = await sync()
+            assert again["changes"] == [] and again["since"] == "2025-02-01T00:00:00Z"
+            await server.ns_client.close()
+
+    asyncio.run(run())
+
+
+def test_sync_query_and_watermark_boundaries():
+    query = server.sync_query("invoice", "2025-01-01T00:00:00Z")
+    assert "FROM transaction WHERE type = 'CustInvc' AND lastModifiedDate >= TO_TIMESTAMP(" in query
+    assert mock_backend.compile_query(query) is not None
+
+    rows = [{"id": str(n), "lastmodifieddate": date} for n, date in enumerate(["a1", "a2", "a2", "a3", "a3"])]
+    assert server.next_watermark(rows, [], ("a0", frozenset())) == ("a3", {"3", "4"})
+    assert server.next_watermark(rows[3:], [], ("a3", frozenset({"9"}))) == ("a3", {"3", "4", "9"})
+    # Nothing from a failed row on is skipped.
+    assert server.next_watermark(rows, [2], ("a0", frozenset())) == ("a2", {"1"})
+    assert server.next_watermark(rows[:1], [0], ("a0", frozenset({"7"}))) == ("a0", {"7"})
+    assert server.next_watermark([], [], ("a0", frozenset())) == ("a0", frozenset())